@@ -24,7 +24,10 @@ def scrape():
         result = scrape_service(
             url=url,
             mode=mode,
-            max_pages=max_pages
+            max_pages=max_pages,
+            render_profile=data.get("render_profile"),
+            engine=data.get("engine", "auto"),
+            cache=data.get("cache", "use")
         )
         return jsonify(result)
 
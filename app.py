@@ -1,96 +1,106 @@
-from flask import Flask, render_template, request, send_file, jsonify
-from core.detector import needs_js
-from core.cleaner import clean_html
-from core.extractor import extract_main_content
-from core.structures import extract_tables, extract_links, extract_images
-from core.paginator import find_next_page
-from core.ethics import check_robots, rate_limit, is_sensitive
-from core.exporter import export_json, export_txt
-from core.products import extract_books
-from engines.static import fetch_static
-from engines.dynamic import fetch_dynamic
-from services.data_manager import log_scrape, get_analytics, load_config, save_config
-import io
-import zipfile
-import requests
+from flask import Flask, Response, abort, render_template, request, send_file, jsonify, redirect, url_for, stream_with_context
+from core.ethics import is_sensitive
+from core.exporter import export_json, ExportRun
+from services.scraper_service import iter_scrape, merge_page, new_stats, count_page, run_meta
+from services.data_manager import DATA_DIR, log_scrape, get_analytics, load_config, save_config
+from services import jobs, metrics, schema_registry
+from services.batch import iter_batch, ORDERS
+from services.image_archive import iter_image_zip
+from pathlib import Path
+import os
+import re
 import time
 import json
 
 app = Flask(__name__)
+EXPORT_DIR = os.path.abspath(os.path.join(DATA_DIR, "exports"))
 
 
-def fetch(url):
-    html = fetch_static(url)
-    if needs_js(html):
-        html = fetch_dynamic(url)
-    return html
-
-
-def scrape(url, max_pages=1, mode="auto"):
+def scrape(url, max_pages=1, mode="auto", render_profile=None, engine="auto", cache="use", progress=None, export=False,
+           crawl=False, max_depth=2, crawl_id=None, changed_only=False, monitor_id=None):
     start_time = time.time()
     if is_sensitive(url):
         log_scrape(url, "blocked", 0, time.time() - start_time)
         raise Exception("Sensitive pages are blocked")
 
+    stats = new_stats()
     try:
-        config = load_config()
-        max_pages = min(max_pages, config.get("max_pages_limit", 10))
-        
-        delay = check_robots(url)
-        page = 0
-        current_url = url
-
         result = {
             "content": [],
             "products": [],
             "tables": [],
             "links": {"internal": [], "external": []},
             "images": [],
-            "stats": {}
+            "stats": {},
+            "meta": {}
         }
 
-        while current_url and page < max_pages:
-            page += 1
-            rate_limit(current_url, delay)
-
-            html = fetch(current_url)
-            soup = clean_html(html)
-
-            is_books = "books.toscrape.com" in current_url
-
-            if mode == "product" or (mode == "auto" and is_books):
-                result["products"].extend(extract_books(soup, current_url))
+        pages = []
+        seen_links = set()
+        run = start_export() if export else None
+        try:
+            records = iter_scrape(
+                url, mode, max_pages, render_profile, engine, cache, progress,
+                crawl=crawl, max_depth=max_depth, crawl_id=crawl_id, changed_only=changed_only,
+                monitor_id=monitor_id
+            )
+            for record in records:
+                merge_page(result, record, seen_links)
+                count_page(stats, record)
+                pages.append(record["meta"])
+                if run:
+                    run.add_page(record)
+        finally:
+            if run:
+                exported = run.close()
+
+        item_count = stats["articles"] + stats["products"] + stats["tables"] + stats["images"]
+        result["stats"] = stats
+        result["meta"] = run_meta(pages)
+        if run:
+            result["meta"]["export"] = exported
+            export_json(result, run.dir / "output.json")
+        
+        log_scrape(url, "success", stats["pages"], time.time() - start_time, item_count)
+        return result
+    except jobs.JobCancelled:
+        log_scrape(url, "cancelled", stats["pages"], time.time() - start_time)
+        raise
+    except Exception as e:
+        log_scrape(url, "error", 0, time.time() - start_time)
+        raise e
 
-            if mode in ["article", "auto"] and not is_books:
-                result["content"].append(extract_main_content(html))
 
-            if mode in ["auto", "tables"]:
-                result["tables"].extend(extract_tables(soup))
+def stream_frame(record, fmt):
+    if fmt == "sse":
+        return f"event: {record['type']}\ndata: {json.dumps(record)}\n\n"
+    return json.dumps(record) + "\n"
 
-            if mode in ["auto", "links"]:
-                links = extract_links(soup, current_url)
-                result["links"]["internal"].extend(links["internal"])
-                result["links"]["external"].extend(links["external"])
 
-            if mode in ["auto", "images"]:
-                result["images"].extend(extract_images(soup, current_url))
+def stream_scrape(params, fmt):
+    # Pulled by the WSGI server one record at a time, so the crawl only moves
+    # ahead as fast as the client reads. A disconnect closes the generator,
+    # which stops the crawl at the next page boundary.
+    url = params["url"]
+    start_time = time.time()
+    stats = new_stats()
+    pages = []
+    status = "cancelled"
 
-            current_url = find_next_page(soup, current_url)
+    try:
+        for record in iter_scrape(**params):
+            count_page(stats, record)
+            pages.append(record["meta"])
+            yield stream_frame(record, fmt)
 
-        item_count = len(result["content"]) + len(result["products"]) + len(result["tables"]) + len(result["images"])
-        result["stats"] = {
-            "pages": page,
-            "articles": len(result["content"]),
-            "products": len(result["products"]),
-            "tables": len(result["tables"]),
-            "images": len(result["images"])
-        }
-        
-        log_scrape(url, "success", page, time.time() - start_time, item_count)
-        return result
+        status = "success"
+        yield stream_frame({"type": "summary", "stats": stats, "meta": run_meta(pages)}, fmt)
     except Exception as e:
-        log_scrape(url, "error", 0, time.time() - start_time)
-        raise e
+        status = "error"
+        yield stream_frame({"type": "error", "error": str(e)}, fmt)
+    finally:
+        item_count = stats["articles"] + stats["products"] + stats["tables"] + stats["images"]
+        log_scrape(url, status, stats["pages"], time.time() - start_time, item_count)
 
 
 @app.route("/")
@@ -98,32 +108,82 @@ def landing():
     return render_template("index.html", landing=True)
 
 
+def start_export():
+    config = load_config()
+    return ExportRun(
+        EXPORT_DIR,
+        compression=config.get("export_compression", "gzip"),
+        table_format=config.get("export_table_format", "csv")
+    )
+
+
+def run_file(run, name):
+    if name == "output.jsonl":
+        found = sorted(Path(EXPORT_DIR, run).glob("output.jsonl*"))
+        return str(found[0]) if found else None
+    path = os.path.join(EXPORT_DIR, run, name)
+    return path if os.path.isfile(path) else None
+
+
+def latest_run(name):
+    # Run ids start with a timestamp, so the newest run sorts last.
+    if not os.path.isdir(EXPORT_DIR):
+        return None
+    runs = sorted((entry.name for entry in os.scandir(EXPORT_DIR) if entry.is_dir()), reverse=True)
+    return next((run for run in runs if run_file(run, name)), None)
+
+
+def export_path(name):
+    # Dashboard runs export under exports/<run>. Old links without a run id
+    # are redirected to the newest run that has the file; nothing writes the
+    # shared top-level files any more.
+    run = request.args.get("run")
+    if not run:
+        run = latest_run(name)
+        if run is None:
+            abort(404)
+        abort(redirect(url_for(request.endpoint, run=run)))
+    if not re.fullmatch(r"[\w-]+", run):
+        abort(404)
+
+    path = run_file(run, name)
+    if path is None:
+        abort(404)
+    return path
+
+
 @app.route("/dashboard", methods=["GET", "POST"])
 def dashboard():
     data = None
     error = None
+    job = None
 
     if request.method == "POST":
+        # The crawl runs on a background worker; the page polls until it's done.
         try:
-            data = scrape(
-                url=request.form["url"],
-                max_pages=int(request.form["pages"]),
-                mode=request.form["mode"]
-            )
-            # Export logic implementation
-            export_json(data, "output.json")
-            
-            content_text = ""
-            if data["content"]:
-                content_text = "\n\n".join(data["content"])
-            elif data["products"]:
-                content_text = "\n".join([f"{p['title']} - {p['price']}" for p in data["products"]])
-            
-            export_txt(content_text, "output.txt")
+            job_id = jobs.submit({
+                "url": request.form["url"],
+                "max_pages": int(request.form["pages"]),
+                "mode": request.form["mode"],
+                "export": True
+            })
+            return redirect(url_for("dashboard", job=job_id))
         except Exception as e:
             error = str(e)
 
-    return render_template("dashboard.html", data=data, error=error)
+    job_id = request.args.get("job")
+    if job_id and not error:
+        job = jobs.get_job(job_id)
+        if job is None:
+            error = "Unknown extraction job"
+        elif job["status"] == "done":
+            data = jobs.get_result(job_id)
+        elif job["status"] == "failed":
+            error = job["error"]
+        elif job["status"] == "cancelled":
+            error = "Extraction job was cancelled"
+
+    return render_template("dashboard.html", data=data, error=error, job=job)
 
 
 @app.route("/api-guide")
@@ -164,77 +224,265 @@ def settings():
     return render_template("settings.html", config=config)
 
 
+@app.route("/metrics")
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
 @app.route("/download/txt")
 def download_txt():
-    return send_file("output.txt", as_attachment=True)
+    return send_file(export_path("output.txt"), as_attachment=True)
 
 
 @app.route("/download/json")
 def download_json():
-    return send_file("output.json", as_attachment=True)
+    return send_file(export_path("output.json"), as_attachment=True)
+
+
+@app.route("/download/jsonl")
+def download_jsonl():
+    return send_file(export_path("output.jsonl"), as_attachment=True)
+
+
+@app.route("/download/tables")
+def download_tables():
+    return send_file(export_path("tables.zip"), as_attachment=True)
 
 
 @app.route("/download/images")
 def download_images():
+    # Resolved outside the try: its 404s and redirects must reach Flask.
+    path = export_path("output.json")
     try:
-        with open("output.json", "r") as f:
+        with open(path, "r") as f:
             data = json.load(f)
         
         images = data.get("images", [])
         if not images:
             return "No images found to download", 404
 
-        memory_file = io.BytesIO()
-        with zipfile.ZipFile(memory_file, 'w') as zf:
-            for i, img in enumerate(images):
-                try:
-                    img_url = img['src']
-                    response = requests.get(img_url, timeout=5, headers={"User-Agent": "Mozilla/5.0"})
-                    if response.status_code == 200:
-                        ext = img_url.split('.')[-1].split('?')[0]
-                        if len(ext) > 4: ext = 'jpg'
-                        zf.writestr(f"image_{i+1}.{ext}", response.content)
-                except:
-                    continue
-        
-        memory_file.seek(0)
-        return send_file(
-            memory_file,
-            mimetype='application/zip',
-            as_attachment=True,
-            download_name='scraped_images.zip'
+        return Response(
+            stream_with_context(iter_image_zip(images)),
+            mimetype="application/zip",
+            headers={"Content-Disposition": "attachment; filename=scraped_images.zip"}
         )
     except Exception as e:
         return str(e), 500
 
 
-@app.route("/api/scrape", methods=["POST"])
-def api_scrape():
+def check_api_key():
     config = load_config()
     provided_key = request.headers.get("X-API-Key")
-    
+
     if provided_key != config.get("api_key"):
         return jsonify({"error": "Invalid or missing API key"}), 401
+    return None
+
+
+STREAM_MIMETYPES = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+
+def stream_format(payload):
+    fmt = payload.get("stream")
+    if fmt in STREAM_MIMETYPES:
+        return fmt
+
+    accept = request.headers.get("Accept", "")
+    for fmt, mimetype in STREAM_MIMETYPES.items():
+        if mimetype in accept:
+            return fmt
+    return None
+
+
+def scrape_params(payload):
+    return {
+        "url": payload["url"],
+        "max_pages": int(payload.get("max_pages", 1)),
+        "mode": payload.get("mode", "auto"),
+        "render_profile": payload.get("render_profile"),
+        "engine": payload.get("engine", "auto"),
+        "cache": payload.get("cache", "use"),
+        "crawl": bool(payload.get("crawl", False)),
+        "max_depth": int(payload.get("max_depth", 2)),
+        "crawl_id": payload.get("crawl_id"),
+        "changed_only": bool(payload.get("changed_only", False)),
+        "monitor_id": payload.get("monitor_id")
+    }
+
+
+@app.route("/api/scrape", methods=["POST"])
+def api_scrape():
+    denied = check_api_key()
+    if denied:
+        return denied
         
     payload = request.get_json()
     if not payload or "url" not in payload:
         return jsonify({"error": "Missing 'url' parameter"}), 400
+
+    if payload.get("async"):
+        return api_submit_job()
+
+    fmt = stream_format(payload)
+    if fmt:
+        if is_sensitive(payload["url"]):
+            log_scrape(payload["url"], "blocked", 0, 0)
+            return jsonify({"error": "Sensitive pages are blocked"}), 403
+        return Response(
+            stream_with_context(stream_scrape(scrape_params(payload), fmt)),
+            mimetype=STREAM_MIMETYPES[fmt],
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
     
     try:
-        results = scrape(
-            url=payload["url"],
-            max_pages=int(payload.get("max_pages", 1)),
-            mode=payload.get("mode", "auto")
-        )
+        results = scrape(**scrape_params(payload))
         return jsonify(results)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/api/scrape/batch", methods=["POST"])
+def api_scrape_batch():
+    denied = check_api_key()
+    if denied:
+        return denied
+
+    payload = request.get_json()
+    if not payload or not isinstance(payload.get("urls"), list) or not payload["urls"]:
+        return jsonify({"error": "Missing 'urls' list"}), 400
+
+    limit = load_config().get("batch_max_urls", 100)
+    if len(payload["urls"]) > limit:
+        return jsonify({"error": f"At most {limit} URLs per batch"}), 400
+
+    order = payload.get("order", "completion")
+    if order not in ORDERS:
+        return jsonify({"error": f"'order' must be one of {ORDERS}"}), 400
+
+    # Top-level mode/max_pages/... are defaults; each entry may override them.
+    defaults = {k: v for k, v in payload.items() if k not in ["urls", "order", "stream"]}
+    try:
+        items = [
+            scrape_params({**defaults, **(entry if isinstance(entry, dict) else {"url": entry})})
+            for entry in payload["urls"]
+        ]
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"error": "Every entry needs a 'url' and a numeric 'max_pages'"}), 400
+
+    fmt = stream_format(payload) or "ndjson"
+    frames = (stream_frame(record, fmt) for record in iter_batch(items, order))
+    return Response(
+        stream_with_context(frames),
+        mimetype=STREAM_MIMETYPES[fmt],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.route("/api/jobs", methods=["POST"])
+def api_submit_job():
+    denied = check_api_key()
+    if denied:
+        return denied
+
+    payload = request.get_json()
+    if not payload or "url" not in payload:
+        return jsonify({"error": "Missing 'url' parameter"}), 400
+
+    job_id = jobs.submit(scrape_params(payload))
+    return jsonify({
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": url_for("api_job_status", job_id=job_id),
+        "result_url": url_for("api_job_result", job_id=job_id)
+    }), 202
+
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def api_job_status(job_id):
+    denied = check_api_key()
+    if denied:
+        return denied
+
+    job = jobs.get_job(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
+
+
+@app.route("/api/jobs/<job_id>/cancel", methods=["POST"])
+def api_cancel_job(job_id):
+    denied = check_api_key()
+    if denied:
+        return denied
+
+    if jobs.get_job(job_id) is None:
+        return jsonify({"error": "Job not found"}), 404
+    if not jobs.cancel(job_id):
+        return jsonify({"error": "Job already finished"}), 409
+    return jsonify(jobs.get_job(job_id))
+
+
+@app.route("/api/jobs/<job_id>/result", methods=["GET"])
+def api_job_result(job_id):
+    denied = check_api_key()
+    if denied:
+        return denied
+
+    job = jobs.get_job(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    if job["status"] != "done":
+        return jsonify({"error": f"Job is {job['status']}", "job": job}), 409
+    return jsonify(jobs.get_result(job_id))
+
+
+@app.route("/api/schemas", methods=["GET"])
+def api_list_schemas():
+    denied = check_api_key()
+    if denied:
+        return denied
+    return jsonify(schema_registry.list_schemas())
+
+
+@app.route("/api/schemas", methods=["POST"])
+def api_register_schema():
+    denied = check_api_key()
+    if denied:
+        return denied
+
+    payload = request.get_json()
+    if not isinstance(payload, dict):
+        return jsonify({"error": "Expected a schema object"}), 400
+    try:
+        schema_registry.register(payload)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid schema: {e}"}), 400
+    return jsonify(payload), 201
+
+
+@app.route("/api/schemas/<name>", methods=["DELETE"])
+def api_remove_schema(name):
+    denied = check_api_key()
+    if denied:
+        return denied
+
+    if not schema_registry.remove(name):
+        return jsonify({"error": "Schema not found (built-in schemas can only be overridden)"}), 404
+    return jsonify({"removed": name})
+
+
 @app.route("/api/health")
 def health():
     return jsonify({"status": "ok"})
 
 
+# Job workers are started by whatever serves the app: here for
+# `python app.py`, and in gunicorn.conf.py's post_fork for each gunicorn
+# worker. Importing the module never starts them.
 if __name__ == "__main__":
-    app.run(debug=True)
+    use_reloader = True
+    # The reloader re-runs this file in a child process (WERKZEUG_RUN_MAIN
+    # set) that does the serving; the parent only watches for changes.
+    if not use_reloader or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        jobs.start_workers(scrape)
+    app.run(debug=True, use_reloader=use_reloader)
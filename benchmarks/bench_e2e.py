@@ -0,0 +1,79 @@
+# End-to-end scrape_service throughput against the local corpus server:
+# pages/s with 1..N jobs in flight. Each job paginates through the books
+# catalogue (mode "product", static engine, HTTP cache bypassed). Jobs get a
+# server (domain) each unless --same-domain, which measures how one site's
+# rate limit and domain slots cap the run instead. The servers' crawl delay
+# (0 by default) is set through core.ethics.DELAY_OVERRIDES, since real sites
+# never get less than 2 s.
+#
+#   python -m benchmarks.bench_e2e --concurrency 1,2,4,8 --latency 20 > before.jsonl
+
+import argparse
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from benchmarks.server import start_server
+from core.ethics import DELAY_OVERRIDES
+from services.scraper_service import scrape_service
+
+
+def run_job(base_url: str, pages: int) -> tuple:
+    start = time.perf_counter()
+    result = scrape_service(
+        f"{base_url}/catalogue/page-1.html", mode="product", max_pages=pages, engine="static", cache="bypass"
+    )
+    return result["meta"]["pages_scraped"], time.perf_counter() - start
+
+
+def run_level(servers: list, concurrency: int, jobs: int, pages: int) -> dict:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        futures = [pool.submit(run_job, servers[i % len(servers)], pages) for i in range(jobs)]
+        done = [f.result() for f in futures]
+    wall = time.perf_counter() - start
+
+    scraped = sum(n for n, _ in done)
+    return {
+        "pages": scraped,
+        "wall_s": round(wall, 3),
+        "pages_per_s": round(scraped / wall, 2),
+        "job_p50_s": round(statistics.median(t for _, t in done), 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", default="1,2,4,8", help="comma-separated job counts in flight")
+    parser.add_argument("--jobs", type=int, default=8, help="jobs per concurrency level")
+    parser.add_argument("--pages", type=int, default=5, help="pages per job (capped by max_pages_limit)")
+    parser.add_argument("--latency", type=float, default=20, help="server latency in ms")
+    parser.add_argument("--crawl-delay", type=float, default=0, help="seconds between requests to one server")
+    parser.add_argument("--same-domain", action="store_true")
+    args = parser.parse_args()
+
+    levels = [int(c) for c in args.concurrency.split(",")]
+    count = 1 if args.same_domain else max(levels)
+    servers = [start_server(latency_ms=args.latency, pages=args.pages)[1] for _ in range(count)]
+    for base_url in servers:
+        DELAY_OVERRIDES[urlsplit(base_url).netloc] = args.crawl_delay
+
+    # Warm imports, robots entries and pooled connections before timing.
+    for base_url in servers:
+        run_job(base_url, 1)
+
+    for concurrency in levels:
+        print(json.dumps({
+            "benchmark": "e2e",
+            "case": f"{'same_domain' if args.same_domain else 'per_domain'}/c{concurrency}",
+            "concurrency": concurrency,
+            "jobs": args.jobs,
+            "pages_per_job": args.pages,
+            "latency_ms": args.latency,
+            **run_level(servers, concurrency, args.jobs, args.pages)
+        }), flush=True)
+
+
+if __name__ == "__main__":
+    main()
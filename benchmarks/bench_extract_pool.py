@@ -0,0 +1,71 @@
+# Extraction throughput (pages/s) on the corpus with N threads extracting
+# in-process versus N threads feeding N extraction worker processes. In
+# process the GIL keeps it near one core whatever N is; the pool should
+# scale with the cores available.
+#
+#   python -m benchmarks.bench_extract_pool --workers 1,2,4 --pages 200
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.bench_extractors import PAGE_URLS
+from benchmarks.server import load_corpus
+from services.extract_pool import ExtractPool
+from services.scraper_service import extract_page, page_needs
+
+PAGES = ["books", "wiki", "article"]
+
+
+def tasks(count: int) -> list:
+    corpus = load_corpus()
+    found = []
+    for i in range(count):
+        name = PAGES[i % len(PAGES)]
+        url = PAGE_URLS[name]
+        found.append((corpus[name], url, page_needs("auto", url), "auto"))
+    return found
+
+
+def throughput(run, work: list, threads: int) -> float:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(lambda args: run(*args), work))
+    return len(work) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", default=f"1,2,{os.cpu_count()}", help="comma-separated thread/process counts")
+    parser.add_argument("--pages", type=int, default=200)
+    args = parser.parse_args()
+
+    work = tasks(args.pages)
+    for n in sorted({int(w) for w in args.workers.split(",")}):
+        # In-process first: same threads, no pool.
+        print(json.dumps({
+            "benchmark": "extract_pool",
+            "case": f"inline/{n}",
+            "workers": n,
+            "pages": len(work),
+            "pages_per_s": round(throughput(extract_page, work, n), 2)
+        }), flush=True)
+
+        pool = ExtractPool(n, queue_size=n, timeout=60, max_rss_mb=1024, max_tasks=10_000)
+        try:
+            pool.run(extract_page, work[0])  # wait for the workers to come up
+            print(json.dumps({
+                "benchmark": "extract_pool",
+                "case": f"processes/{n}",
+                "workers": n,
+                "cpus": os.cpu_count(),
+                "pages": len(work),
+                "pages_per_s": round(throughput(lambda *a: pool.run(extract_page, a), work, n), 2)
+            }), flush=True)
+        finally:
+            pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# Per-extractor cost on each corpus page: time, Python-side peak memory and
+# the blocks still allocated once the result is built. libxml2's own memory
+# is invisible to tracemalloc; bench_partial_parse measures RSS for that.
+#
+#   python -m benchmarks.bench_extractors --repeat 20 > before.jsonl
+
+import argparse
+import copy
+import gc
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+from benchmarks.server import load_corpus
+from core.cleaner import parse_html, clean_tree
+from core.detector import needs_js, has_static_content
+from core.extractor import extract_main_content, HeadingsExtractor, MetadataExtractor
+from core.paginator import NextPageExtractor, scan_pagination
+from core.schemas import SchemaExtractor
+from core.stream import stream_extract
+from core.structures import TablesExtractor, ListsExtractor, LinksExtractor, ImagesExtractor
+from core.urls import resolve_url, url_host
+from services.schema_registry import DEFAULT_SCHEMA
+
+PAGE_URLS = {
+    "books": "https://books.toscrape.com/catalogue/page-1.html",
+    "wiki": "https://en.wikipedia.org/wiki/Benchland_railway_network",
+    "article": "https://news.example.com/news/harbour-railway",
+    "spa": "https://shop.example.com/app/"
+}
+TREE_EXTRACTORS = {
+    "tables": lambda url: TablesExtractor(),
+    "lists": lambda url: ListsExtractor(),
+    "links": lambda url: LinksExtractor(url),
+    "images": lambda url: ImagesExtractor(url),
+    "headings": lambda url: HeadingsExtractor(),
+    "metadata": lambda url: MetadataExtractor(),
+    "next_page": lambda url: NextPageExtractor(url),
+    "books": lambda url: SchemaExtractor(DEFAULT_SCHEMA, url)
+}
+
+
+def cases(html: str, url: str) -> dict:
+    # name -> (prepare, run). prepare() builds the input outside the timer,
+    # so a case that mutates its tree gets a fresh one every round.
+    raw = parse_html(html)
+    cleaned = clean_tree(copy.deepcopy(raw))
+    found = {
+        "parse": (lambda: html, parse_html),
+        "clean": (lambda: copy.deepcopy(raw), clean_tree),
+        "detector": (lambda: html, lambda h: (needs_js(h), has_static_content(h))),
+        "readability": (lambda: copy.deepcopy(raw), extract_main_content),
+        "pagination_scan": (lambda: html, lambda h: scan_pagination(h, url)),
+        "stream": (lambda: html, lambda h: stream_extract(h, {
+            "links": LinksExtractor(url), "images": ImagesExtractor(url), "next_page": NextPageExtractor(url)
+        }))
+    }
+    for name, make in TREE_EXTRACTORS.items():
+        found[name] = (lambda: cleaned, lambda root, make=make: make(url).run(root))
+    return found
+
+
+def measure(prepare, run, repeat: int) -> dict:
+    times = []
+    for _ in range(repeat):
+        # Cold URL caches each round, as for a freshly fetched page.
+        resolve_url.cache_clear()
+        url_host.cache_clear()
+        arg = prepare()
+        start = time.perf_counter()
+        run(arg)
+        times.append(time.perf_counter() - start)
+
+    resolve_url.cache_clear()
+    url_host.cache_clear()
+    arg = prepare()
+    gc.collect()
+    tracemalloc.start()
+    blocks = sys.getallocatedblocks()
+    result = run(arg)
+    gc.collect()
+    retained = sys.getallocatedblocks() - blocks
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del result
+
+    return {
+        "best_ms": round(min(times) * 1000, 3),
+        "median_ms": round(statistics.median(times) * 1000, 3),
+        "peak_kb": round(peak / 1024, 1),
+        "retained_blocks": retained
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--page", choices=list(PAGE_URLS), action="append", help="default: every corpus page")
+    parser.add_argument("--case", action="append", help="default: every case")
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    for page in args.page or PAGE_URLS:
+        html, url = corpus[page], PAGE_URLS[page]
+        for name, (prepare, run) in cases(html, url).items():
+            if args.case and name not in args.case:
+                continue
+            print(json.dumps({
+                "benchmark": "extractors",
+                "case": f"{page}/{name}",
+                "page": page,
+                "html_bytes": len(html.encode("utf-8")),
+                **measure(prepare, run, args.repeat)
+            }), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# Tree parse + walk vs. the tree-less stream parse used by links/images jobs.
+# Each variant runs in a fresh child process so peak RSS includes libxml2's
+# own allocations, which tracemalloc cannot see.
+#
+#   python -m benchmarks.bench_partial_parse --sections 2000
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+from benchmarks.bench_traversal import wiki_page, BASE_URL
+from core.document import ParsedPage
+from core.paginator import NextPageExtractor
+from core.structures import LinksExtractor, ImagesExtractor
+
+VARIANTS = ["tree", "stream"]
+
+
+def extractors() -> dict:
+    return {
+        "links": LinksExtractor(BASE_URL),
+        "images": ImagesExtractor(BASE_URL),
+        "next_page": NextPageExtractor(BASE_URL)
+    }
+
+
+def run_variant(variant: str, sections: int, repeat: int) -> dict:
+    html = wiki_page(sections)
+    # needs=None keeps ParsedPage on the full tree path, as in "auto" mode.
+    needs = {"links", "images"} if variant == "stream" else None
+
+    base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        doc = ParsedPage(html, BASE_URL, needs)
+        doc.extract(extractors())
+        best = min(best, time.perf_counter() - start)
+        stats = doc.stats()
+
+    return {
+        "benchmark": "partial_parse",
+        "variant": variant,
+        "parser": stats["parser"],
+        "html_bytes": len(html),
+        "best_ms": round(best * 1000, 3),
+        "peak_rss_delta_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base_rss
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sections", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--variant", choices=VARIANTS)
+    args = parser.parse_args()
+
+    if args.variant:
+        print(json.dumps(run_variant(args.variant, args.sections, args.repeat)))
+        return
+
+    for variant in VARIANTS:
+        subprocess.run([
+            sys.executable, "-m", "benchmarks.bench_partial_parse",
+            "--variant", variant, "--sections", str(args.sections), "--repeat", str(args.repeat)
+        ], check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# The table engine against the previous thead/tbody walk on one large
+# table: kept as lists, and streamed row by row into a CSV writer.
+#
+#   python -m benchmarks.bench_tables --rows 10000 --repeat 5
+
+import argparse
+import csv
+import json
+import os
+from benchmarks.bench_extractors import measure
+from core.cleaner import clean_html, text_of
+from core.structures import TablesExtractor
+
+
+def wide_table(rows: int, spans: bool) -> str:
+    # Wiki style: header row of <th> in the body, a grouping cell spanning
+    # three rows and an occasional full-width note row.
+    parts = ["<html><body><table class='wikitable'>",
+             "<tr><th>Line</th><th>Station</th><th>Opened</th><th>Passengers</th><th>Notes</th></tr>"]
+    for i in range(rows):
+        group = f"<td rowspan='3'>Line {i // 3}</td>" if spans and i % 3 == 0 else ("" if spans else f"<td>Line {i // 3}</td>")
+        if spans and i % 50 == 49:
+            parts.append(f"<tr><td colspan='4'><i>Closed</i> {i}</td></tr>")
+            continue
+        parts.append(f"<tr>{group}<td><a href='/wiki/S{i}'>Station {i}</a></td><td>{1900 + i % 120}</td>"
+                     f"<td>{i * 37 % 100000:,}</td><td>Note <b>{i}</b></td></tr>")
+    parts.append("</table></body></html>")
+    return "".join(parts)
+
+
+def legacy(root) -> list:
+    # TablesExtractor before the table engine.
+    tables = []
+    for table in root.iter("table"):
+        rows = []
+        headers = []
+        thead = table.find(".//thead")
+        if thead is not None:
+            headers = [text_of(th) for th in thead.iter("th")]
+        tbody = table.find(".//tbody")
+        if tbody is None:
+            tbody = table
+        for tr in tbody.iter("tr"):
+            cells = [text_of(td) for td in tr.iter("td", "th")]
+            if cells:
+                rows.append(cells)
+        if rows:
+            tables.append({"headers": headers, "rows": rows})
+    return tables
+
+
+def streamed(root) -> list:
+    with open(os.devnull, "w", newline="") as f:
+        writer = csv.writer(f)
+
+        def sink(headers, rows):
+            writer.writerow(headers)
+            count = 0
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+            return count
+
+        return TablesExtractor(sink).run(root)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    variants = {
+        "legacy": legacy,
+        "engine": lambda root: TablesExtractor().run(root),
+        "engine_stream": streamed
+    }
+    for layout in ["plain", "spans"]:
+        html = wide_table(args.rows, layout == "spans")
+        root = clean_html(html)
+        for name, run in variants.items():
+            print(json.dumps({
+                "benchmark": "tables",
+                "case": f"{layout}/{name}",
+                "rows": args.rows,
+                "html_bytes": len(html),
+                **measure(lambda: root, run, args.repeat)
+            }), flush=True)
+
+
+if __name__ == "__main__":
+    main()
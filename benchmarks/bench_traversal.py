@@ -0,0 +1,113 @@
+# Compares one tree walk per extractor against the shared single walk.
+#
+#   python -m benchmarks.bench_traversal --sections 200 --repeat 5
+
+import argparse
+import json
+import time
+from core import visitor
+from core.urls import resolve_url, url_host
+from core.cleaner import clean_html
+from core.extractor import extract_headings, HeadingsExtractor
+from core.paginator import find_next_page, NextPageExtractor
+from core.structures import (
+    extract_tables, extract_lists, extract_links, extract_images,
+    TablesExtractor, ListsExtractor, LinksExtractor, ImagesExtractor
+)
+
+BASE_URL = "https://en.wikipedia.org/wiki/Benchmark"
+
+
+def wiki_page(sections: int) -> str:
+    parts = ["<html><head><title>Benchmark</title></head><body><nav><a href='/'>Home</a></nav>"]
+    for i in range(sections):
+        parts.append(f"<h2>Section {i}</h2><h3>Sub {i}</h3><p>" + "Text with a <a href='/wiki/L{0}'>link</a> and more words. ".format(i) * 5 + "</p>")
+        parts.append("<table class='wikitable'><tr><th>Key</th><th>Value</th></tr>" + "".join(
+            f"<tr><td>{i}.{r}</td><td><a href='https://ext{r}.org/'>ref</a></td></tr>" for r in range(10)) + "</table>")
+        parts.append("<ul>" + "".join(f"<li>Item {i}.{j}</li>" for j in range(5)) + "</ul>")
+        parts.append(f"<img src='/img/{i}.png' alt='Figure {i}'>")
+    parts.append("<a rel='next' href='?page=2'>next</a></body></html>")
+    return "".join(parts)
+
+
+def separate(root):
+    return {
+        "tables": extract_tables(root),
+        "lists": extract_lists(root),
+        "links": extract_links(root, BASE_URL),
+        "images": extract_images(root, BASE_URL),
+        "headings": extract_headings(root),
+        "next_page": find_next_page(root, BASE_URL)
+    }
+
+
+def shared(root):
+    return visitor.run_extractors(root, {
+        "tables": TablesExtractor(),
+        "lists": ListsExtractor(),
+        "links": LinksExtractor(BASE_URL),
+        "images": ImagesExtractor(BASE_URL),
+        "headings": HeadingsExtractor(),
+        "next_page": NextPageExtractor(BASE_URL)
+    })
+
+
+def count_walks(fn, root) -> int:
+    walks = 0
+    original = visitor.run_extractors
+
+    def counting(*args, **kwargs):
+        nonlocal walks
+        walks += 1
+        return original(*args, **kwargs)
+
+    visitor.run_extractors = counting
+    try:
+        fn(root)
+    finally:
+        visitor.run_extractors = original
+    return walks
+
+
+def bench(variants: dict, root, repeat: int) -> dict:
+    # Interleaved so both variants see the same machine noise.
+    best = {name: float("inf") for name in variants}
+    for _ in range(repeat):
+        for name, fn in variants.items():
+            # Cold URL caches each round, as for a freshly fetched page.
+            resolve_url.cache_clear()
+            url_host.cache_clear()
+            start = time.perf_counter()
+            fn(root)
+            best[name] = min(best[name], time.perf_counter() - start)
+    return {name: t * 1000 for name, t in best.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sections", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    html = wiki_page(args.sections)
+    root = clean_html(html)
+    assert separate(root) == shared(root), "single walk must match per-extractor output"
+
+    variants = {"separate": separate, "shared": shared}
+    timings = bench(variants, root, args.repeat)
+    elements = sum(1 for _ in root.iter())
+    for name, fn in variants.items():
+        walks = count_walks(fn, root)
+        print(json.dumps({
+            "benchmark": "traversal",
+            "variant": name,
+            "html_bytes": len(html),
+            "elements": elements,
+            "walks": walks,
+            "nodes_walked": walks * elements,
+            "best_ms": round(timings[name], 3)
+        }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# Compares two runs of any benchmark in this package (JSON lines, one record
+# per case) and prints the change per metric. Exits non-zero when a metric got
+# worse by more than --fail-above percent, so it can gate a change.
+#
+#   python -m benchmarks.compare before.jsonl after.jsonl --fail-above 10
+
+import argparse
+import json
+import sys
+
+# Metric -> True when higher is better.
+METRICS = {
+    "best_ms": False,
+    "median_ms": False,
+    "peak_kb": False,
+    "retained_blocks": False,
+    "peak_rss_delta_kb": False,
+    "wall_s": False,
+    "job_p50_s": False,
+    "pages_per_s": True
+}
+
+
+def load(path: str) -> dict:
+    records = {}
+    with open(path, "r") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                records[(record["benchmark"], record.get("case") or record.get("variant"))] = record
+    return records
+
+
+def change(before, after) -> float | None:
+    if not before:
+        return None
+    return (after - before) / before * 100
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--fail-above", type=float, help="percent regression that fails the run")
+    args = parser.parse_args()
+
+    before, after = load(args.before), load(args.after)
+    regressions = 0
+    print(f"{'case':<40} {'metric':<16} {'before':>12} {'after':>12} {'change':>9}")
+    for key in sorted(before.keys() & after.keys(), key=str):
+        for metric, higher_is_better in METRICS.items():
+            if metric not in before[key] or metric not in after[key]:
+                continue
+            old, new = before[key][metric], after[key][metric]
+            pct = change(old, new)
+            worse = pct is not None and (-pct if higher_is_better else pct)
+            flag = ""
+            if args.fail_above is not None and worse and worse > args.fail_above:
+                flag = "  REGRESSED"
+                regressions += 1
+            shown = "n/a" if pct is None else f"{pct:+.1f}%"
+            print(f"{key[0] + ':' + key[1]:<40} {metric:<16} {old:>12} {new:>12} {shown:>9}{flag}")
+
+    for key in sorted(before.keys() ^ after.keys(), key=str):
+        print(f"{key[0] + ':' + key[1]:<40} only in {'before' if key in before else 'after'}")
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
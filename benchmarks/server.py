@@ -0,0 +1,105 @@
+# Serves the checked-in corpus over HTTP so end-to-end benchmarks never touch
+# the network. Every response is held back by --latency ms, and the books
+# listing is paginated to --pages pages (catalogue/page-N.html).
+#
+#   python -m benchmarks.server --port 8765 --latency 50 --pages 50
+
+import argparse
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+CORPUS_DIR = Path(__file__).parent / "corpus"
+CORPUS = {
+    "books": "books.html",
+    "wiki": "wiki_tables.html",
+    "article": "article.html",
+    "spa": "spa_shell.html"
+}
+ROUTES = {
+    "/wiki/Benchland_railway_network": "wiki",
+    "/news/harbour-railway": "article",
+    "/app/": "spa"
+}
+PAGE_PATH = re.compile(r"/catalogue/page-(\d+)\.html")
+PAGER = re.compile(r'<ul class="pager">.*?</ul>', re.S)
+
+
+def load_corpus() -> dict:
+    return {name: (CORPUS_DIR / filename).read_text(encoding="utf-8") for name, filename in CORPUS.items()}
+
+
+def books_page(html: str, number: int, pages: int) -> str:
+    pager = [f'<li class="current">Page {number} of {pages}</li>']
+    if number > 1:
+        pager.insert(0, f'<li class="previous"><a href="page-{number - 1}.html">previous</a></li>')
+    if number < pages:
+        pager.append(f'<li class="next"><a href="page-{number + 1}.html">next</a></li>')
+    return PAGER.sub(lambda m: '<ul class="pager">' + "".join(pager) + "</ul>", html)
+
+
+def make_handler(corpus: dict, latency_ms: float, pages: int, crawl_delay: int):
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            if latency_ms:
+                time.sleep(latency_ms / 1000)
+
+            path = self.path.split("?", 1)[0]
+            page = PAGE_PATH.fullmatch(path)
+            if path == "/robots.txt":
+                self.reply(f"User-agent: *\nCrawl-delay: {crawl_delay}\nAllow: /\n", "text/plain")
+            elif page and 1 <= int(page.group(1)) <= pages:
+                self.reply(books_page(corpus["books"], int(page.group(1)), pages))
+            elif path in ROUTES:
+                self.reply(corpus[ROUTES[path]])
+            else:
+                self.reply("not found", "text/plain", 404)
+
+        def reply(self, body: str, content_type: str = "text/html", status: int = 200):
+            data = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start_server(port: int = 0, latency_ms: float = 0, pages: int = 50, crawl_delay: int = 0):
+    # Runs on a daemon thread; port 0 picks a free one. Each port is its own
+    # domain to the scraper, with its own robots entry and rate limit.
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(load_corpus(), latency_ms, pages, crawl_delay))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0, help="ms added to every response")
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--crawl-delay", type=int, default=0)
+    args = parser.parse_args()
+
+    server, base_url = start_server(args.port, args.latency, args.pages, args.crawl_delay)
+    print(f"Serving {CORPUS_DIR} at {base_url}/catalogue/page-1.html")
+    for path in ROUTES:
+        print(f"  {base_url}{path}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
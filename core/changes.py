@@ -0,0 +1,139 @@
+import difflib
+import hashlib
+import re
+from collections import Counter
+
+# Bump when extraction output changes shape, so stored results from older
+# code are not reused.
+FINGERPRINT_VERSION = "2"
+
+# Parts of a page that change on every request without changing what we
+# extract: scripts (nonces, tracking state), styles, comments, and CSRF tokens
+# in hidden inputs and <meta> tags.
+NOISE = re.compile(
+    r"<script\b.*?</script>|<style\b.*?</style>|<!--.*?-->|<noscript\b.*?</noscript>"
+    r"|<input\b[^>]*type=[\"']?hidden[^>]*>"
+    r"|<meta\b[^>]*\b(?:name|property|http-equiv)\s*=\s*[\"']?[\w:.-]*"
+    r"(?:csrf|xsrf|token|nonce|request[-_]?id|timestamp)[^>]*>",
+    re.S | re.I
+)
+# Per-request attributes: nonces, timestamps, ad slot and query ids. A
+# separate pass, since NOISE is fast only while every branch starts with "<".
+VOLATILE_ATTRS = re.compile(
+    r"\s(?:nonce|data-(?:csrf|xsrf|token|nonce|timestamp|ts|request-id|google-query-id))"
+    r"\s*=\s*(?:\"[^\"]*\"|'[^']*'|[^\s>]+)"
+    r"|\sid\s*=\s*[\"']?(?:div-gpt-ad|google_ads_iframe)[^\"'\s>]*[\"']?",
+    re.I
+)
+WHITESPACE = re.compile(r"\s+")
+
+DATA_KEYS = ["content", "products", "tables", "links", "images"]
+MAX_DIFF_LINES = 40
+
+
+def fingerprint(html: str) -> str:
+    # Regex normalization of the raw HTML, not a hash of the parsed text:
+    # checking a page must cost far less than the parse and extraction it
+    # lets us skip, and the stored record also carries attributes (link
+    # hrefs, image srcs, schema fields read from attributes) that a
+    # text-only hash would miss.
+    normalized = WHITESPACE.sub(" ", VOLATILE_ATTRS.sub("", NOISE.sub("", html)))
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(FINGERPRINT_VERSION.encode())
+    digest.update(normalized.encode("utf-8", "replace"))
+    return digest.hexdigest()
+
+
+def product_key(product: dict) -> str:
+    return product.get("url") or product.get("title") or repr(sorted(product.items()))
+
+
+def diff_products(old: list, new: list) -> tuple:
+    before = {product_key(p): p for p in old}
+    after = {product_key(p): p for p in new}
+    changed = {}
+    for key, product in after.items():
+        if key in before and before[key] != product:
+            changed[key] = {
+                field: [before[key].get(field), value]
+                for field, value in product.items() if before[key].get(field) != value
+            }
+
+    items = [p for key, p in after.items() if key not in before or key in changed]
+    return items, {
+        "added": sum(1 for key in after if key not in before),
+        "removed": [key for key in before if key not in after],
+        "changed": changed
+    }
+
+
+def diff_tables(old: list, new: list) -> tuple:
+    # Tables are matched by position; rows are compared as a multiset, so a
+    # re-sorted table with the same rows counts as unchanged.
+    tables = []
+    diffs = []
+    for i, table in enumerate(new):
+        previous = old[i] if i < len(old) and old[i]["headers"] == table["headers"] else {"rows": []}
+        before = Counter(tuple(row) for row in previous["rows"])
+        after = Counter(tuple(row) for row in table["rows"])
+        added = [list(row) for row in (after - before).elements()]
+        removed = [list(row) for row in (before - after).elements()]
+        if added or removed:
+            diffs.append({"index": i, "added": len(added), "removed": removed})
+        if added:
+            tables.append({"headers": table["headers"], "rows": added, "index": i})
+
+    for i in range(len(new), len(old)):
+        diffs.append({"index": i, "added": 0, "removed": old[i]["rows"]})
+    return tables, diffs
+
+
+def diff_list(old: list, new: list, key=lambda item: item) -> tuple:
+    before = {key(item) for item in old}
+    after = {key(item) for item in new}
+    return [item for item in new if key(item) not in before], [k for k in before if k not in after]
+
+
+def diff_content(old: str, new: str) -> list:
+    lines = difflib.unified_diff(old.splitlines(), new.splitlines(), lineterm="", n=0)
+    changes = [line for line in lines if not line.startswith(("---", "+++", "@@")) and line[1:].strip()]
+    if len(changes) > MAX_DIFF_LINES:
+        changes = changes[:MAX_DIFF_LINES] + [f"... {len(changes) - MAX_DIFF_LINES} more lines"]
+    return changes
+
+
+def changed_only(previous: dict | None, record: dict, change: str) -> dict:
+    # Cuts a page record down to what differs from the previous run, plus a
+    # compact "diff". Unchanged pages keep only their url and meta.
+    if change == "new" or previous is None:
+        return {**record, "change": "new"}
+
+    slim = {k: v for k, v in record.items() if k not in DATA_KEYS}
+    if change == "unchanged":
+        return {**slim, "change": "unchanged"}
+
+    diff = {}
+    if "content" in record and record["content"] != previous.get("content"):
+        slim["content"] = record["content"]
+        diff["content"] = diff_content(previous.get("content") or "", record["content"])
+    if "products" in record:
+        slim["products"], products = diff_products(previous.get("products", []), record["products"])
+        if slim["products"] or products["removed"]:
+            diff["products"] = products
+    if "tables" in record:
+        slim["tables"], tables = diff_tables(previous.get("tables", []), record["tables"])
+        if tables:
+            diff["tables"] = tables
+    if "links" in record:
+        old = previous.get("links", {"internal": [], "external": []})
+        slim["links"] = {}
+        for kind in ["internal", "external"]:
+            slim["links"][kind], removed = diff_list(old[kind], record["links"][kind])
+            if slim["links"][kind] or removed:
+                diff.setdefault("links", {})[kind] = {"added": len(slim["links"][kind]), "removed": removed}
+    if "images" in record:
+        slim["images"], removed = diff_list(previous.get("images", []), record["images"], key=lambda img: img["src"])
+        if slim["images"] or removed:
+            diff["images"] = {"added": len(slim["images"]), "removed": removed}
+
+    return {**slim, "change": "changed", "diff": diff}
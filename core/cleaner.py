@@ -1,4 +1,6 @@
-from bs4 import BeautifulSoup
+import lxml.html
+from lxml.etree import ParserError
+from core.timing import timed
 
 REMOVE_TAGS = [
     "script", "style", "noscript", "iframe",
@@ -6,14 +8,34 @@ REMOVE_TAGS = [
 ]
 
 
-def clean_html(html: str) -> BeautifulSoup:
-    soup = BeautifulSoup(html, "lxml")
+@timed("parse")
+def parse_html(html: str) -> lxml.html.HtmlElement:
+    try:
+        return lxml.html.document_fromstring(html)
+    except ValueError:
+        # lxml refuses str input that still carries an XML encoding declaration
+        return lxml.html.document_fromstring(html.encode("utf-8"), parser=lxml.html.HTMLParser(encoding="utf-8"))
+    except ParserError:
+        return lxml.html.document_fromstring("<html></html>")
 
-    for tag in REMOVE_TAGS:
-        for el in soup.find_all(tag):
-            el.decompose()
 
-    return soup
+@timed("clean")
+def clean_tree(root: lxml.html.HtmlElement) -> lxml.html.HtmlElement:
+    for el in list(root.iter(*REMOVE_TAGS)):
+        el.drop_tree()
+
+    return root
+
+
+def clean_html(html: str) -> lxml.html.HtmlElement:
+    return clean_tree(parse_html(html))
+
+
+def text_of(el) -> str:
+    # Same result as BeautifulSoup's get_text(strip=True)
+    if not len(el):
+        return (el.text or "").strip()
+    return "".join(s.strip() for s in el.itertext())
 
 
 def clean_text(text: str) -> str:
@@ -1,3 +1,9 @@
+import lxml.html
+
+# Visible text below this many characters means the static HTML is only a shell.
+MIN_CONTENT_CHARS = 500
+
+
 def needs_js(html: str) -> bool:
     signals = [
         "id=\"__next\"",
@@ -7,3 +13,16 @@ def needs_js(html: str) -> bool:
     ]
 
     return any(signal in html for signal in signals)
+
+
+def has_static_content(html: str, min_chars: int = MIN_CONTENT_CHARS) -> bool:
+    try:
+        root = lxml.html.fromstring(html)
+    except Exception:
+        return False
+
+    for el in root.xpath("//script|//style|//noscript|//template"):
+        el.drop_tree()
+
+    text = " ".join(root.text_content().split())
+    return len(text) >= min_chars
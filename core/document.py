@@ -0,0 +1,75 @@
+import copy
+import time
+from functools import cached_property
+from core.cleaner import parse_html, clean_tree
+from core.extractor import extract_main_content, MetadataExtractor
+from core.stream import is_streamable, stream_extract
+from core.visitor import run_extractors
+
+
+class ParsedPage:
+    # At most one lxml parse of the page, built only when something needs it;
+    # main content adds a second, smaller one of readability's summary.
+    # `needs` is the set of outputs the caller will ask for (None = anything).
+    # Readability works on its own deep copy but first drops hidden elements
+    # from the tree it is given, so the raw tree is only cleaned in place
+    # when "content" isn't needed and readability will never see it.
+
+    def __init__(self, html: str, url: str = "", needs: set | None = None):
+        self.html = html
+        self.url = url
+        self.needs = needs
+        self.parser = None
+        self.parses = 0
+        self.parse_ms = 0.0
+        self._tree = None
+
+    def _timed(self, fn, *args):
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self.parse_ms += (time.perf_counter() - start) * 1000
+
+    def _raw_tree(self):
+        if self._tree is None:
+            self._tree = self._timed(parse_html, self.html)
+            self.parses += 1
+            self.parser = "tree"
+        return self._tree
+
+    @cached_property
+    def cleaned(self):
+        tree = self._raw_tree()
+        if self.needs is None or "content" in self.needs:
+            tree = copy.deepcopy(tree)
+        else:
+            self._tree = None
+        return self._timed(clean_tree, tree)
+
+    @cached_property
+    def main_content(self) -> str:
+        self.cleaned
+        tree, self._tree = self._raw_tree(), None
+        # extract_main_content parses readability's summary HTML again.
+        self.parses += 1
+        return extract_main_content(tree)
+
+    @cached_property
+    def metadata(self) -> dict:
+        return MetadataExtractor().run(self.cleaned)
+
+    def extract(self, extractors: dict) -> dict:
+        # Narrow jobs (links, images, pagination) never need a tree at all.
+        if self.parser is None and self.needs is not None and is_streamable(extractors):
+            self.parses += 1
+            self.parser = "stream"
+            return self._timed(stream_extract, self.html, extractors)
+        return run_extractors(self.cleaned, extractors)
+
+    def stats(self) -> dict:
+        return {
+            "parser": self.parser,
+            "parses": self.parses,
+            "parse_ms": round(self.parse_ms, 2)
+        }
@@ -1,39 +1,83 @@
+import threading
 import time
-import requests
+from contextlib import contextmanager
+from engines import client
+from services import domain_store
+from core.timing import timed
 from urllib.parse import urlparse
 from urllib.robotparser import RobotFileParser
 
 _DOMAIN_RP_CACHE = {}
-_DOMAIN_LAST_HIT = {}
+_DOMAIN_SLOTS = {}
+_DOMAIN_LOCK = threading.Lock()
 
 # Use a standard browser user agent to avoid being blocked by strict robots.txt checks
 DEFAULT_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36"
 
+# Per-host crawl delays that replace robots.txt and the 2 s floor. Empty in
+# production; the benchmarks register their local servers here.
+DELAY_OVERRIDES = {}
 
-def check_robots(url: str, user_agent=DEFAULT_USER_AGENT) -> int:
-    parsed = urlparse(url)
+
+def _download_robots(parsed, user_agent: str) -> dict:
     domain = parsed.netloc
     robots_url = f"{parsed.scheme}://{domain}/robots.txt"
 
-    if domain in _DOMAIN_RP_CACHE:
-        rp = _DOMAIN_RP_CACHE[domain]
+    # Use requests to fetch robots.txt with a real user agent
+    try:
+        r = client.get(robots_url, headers={"User-Agent": user_agent}, timeout=5)
+        if r.status_code == 200:
+            return domain_store.save_robots(domain, body=r.text)
+        elif r.status_code == 403 or r.status_code == 401:
+            # If robots.txt is explicitly forbidden, we should be careful.
+            # However, many sites block bot access to robots.txt itself.
+            # We'll return a conservative delay.
+            return domain_store.save_robots(domain, fallback_delay=3)
+        else:
+            return domain_store.save_robots(domain, fallback_delay=2)
+    except:
+        return domain_store.save_robots(domain, fallback_delay=2)  # default delay
+
+
+def _fetch_robots(parsed, user_agent: str):
+    # A parser on success, otherwise the fallback delay to use instead. The
+    # answer, failures included, is shared by all workers through the domain
+    # store; each process only keeps the parsed form of the current entry.
+    domain = parsed.netloc
+    entry = domain_store.load_robots(domain)
+    if entry is None:
+        entry = _download_robots(parsed, user_agent)
+    if entry["body"] is None:
+        return entry["fallback_delay"]
+
+    cached = _DOMAIN_RP_CACHE.get(domain)
+    if cached and cached[0] == entry["fetched_at"]:
+        return cached[1]
+
+    rp = RobotFileParser()
+    rp.parse(entry["body"].splitlines())
+    _DOMAIN_RP_CACHE[domain] = (entry["fetched_at"], rp)
+    return rp
+
+
+@timed("robots")
+def check_robots(url: str, user_agent=DEFAULT_USER_AGENT, robots: dict | None = None) -> int:
+    parsed = urlparse(url)
+    domain = parsed.netloc
+    if domain in DELAY_OVERRIDES:
+        return DELAY_OVERRIDES[domain]
+
+    # `robots` lets a batch share one lookup per domain, failures included,
+    # instead of re-requesting an unreachable robots.txt for every URL.
+    if robots is not None and domain in robots:
+        rp = robots[domain]
     else:
-        rp = RobotFileParser()
-        # Use requests to fetch robots.txt with a real user agent
-        try:
-            r = requests.get(robots_url, headers={"User-Agent": user_agent}, timeout=5)
-            if r.status_code == 200:
-                rp.parse(r.text.splitlines())
-                _DOMAIN_RP_CACHE[domain] = rp
-            elif r.status_code == 403 or r.status_code == 401:
-                # If robots.txt is explicitly forbidden, we should be careful.
-                # However, many sites block bot access to robots.txt itself.
-                # We'll return a conservative delay.
-                return 3
-            else:
-                return 2
-        except:
-            return 2  # default delay
+        rp = _fetch_robots(parsed, user_agent)
+        if robots is not None:
+            robots[domain] = rp
+
+    if isinstance(rp, int):
+        return rp
 
     # If we have a cached parser
     if not rp.can_fetch(user_agent, url):
@@ -45,16 +89,28 @@ def check_robots(url: str, user_agent=DEFAULT_USER_AGENT) -> int:
     return rp.crawl_delay(user_agent) or 2
 
 
+def reserve_slot(url: str, delay: float) -> float:
+    # Books the domain's next request slot across all workers and returns the
+    # seconds until it starts, leaving the waiting to the caller.
+    start = domain_store.reserve_slot(urlparse(url).netloc, delay)
+    return max(0.0, start - time.time())
+
+
+@timed("rate_limit")
 def rate_limit(url: str, delay: int):
-    domain = urlparse(url).netloc
-    last = _DOMAIN_LAST_HIT.get(domain)
+    sleep_time = reserve_slot(url, delay)
+    if sleep_time > 0:
+        time.sleep(sleep_time)
 
-    if last:
-        sleep_time = delay - (time.time() - last)
-        if sleep_time > 0:
-            time.sleep(sleep_time)
 
-    _DOMAIN_LAST_HIT[domain] = time.time()
+@contextmanager
+def domain_slot(url: str, limit: int = 2):
+    # Caps how many requests to one domain are in flight at once.
+    domain = urlparse(url).netloc
+    with _DOMAIN_LOCK:
+        slots = _DOMAIN_SLOTS.setdefault(domain, threading.BoundedSemaphore(limit))
+    with slots:
+        yield
 
 
 def is_sensitive(url: str) -> bool:
@@ -1,13 +1,26 @@
+import gzip
+import io
 import json
 import csv
+import time
+import uuid
+import zipfile
 from pathlib import Path
+from core.timing import timed
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSION_SUFFIXES = {None: "", "gzip": ".gz", "zstd": ".zst"}
+TABLE_FORMATS = {"csv": ",", "tsv": "\t"}
 
 
 def export_json(data, path="output.json"):
-    Path(path).write_text(
-        json.dumps(data, indent=2, ensure_ascii=False),
-        encoding="utf-8"
-    )
+    # json.dump writes as it encodes instead of building one big string first
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
 
 
 def export_txt(text, path="output.txt"):
@@ -27,3 +40,159 @@ def export_tables_csv(tables, base="tables"):
             if table.get("headers"):
                 writer.writerow(table["headers"])
             writer.writerows(table["rows"])
+
+
+def run_dir(base="exports", run_id: str | None = None) -> Path:
+    # One directory per scrape, so concurrent runs never share output files.
+    run_id = run_id or f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    path = Path(base) / run_id
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def check_compression(compression: str | None):
+    if compression not in COMPRESSION_SUFFIXES:
+        raise ValueError(f"Unknown compression: {compression}")
+    if compression == "zstd" and zstandard is None:
+        raise RuntimeError("zstd compression needs the 'zstandard' package")
+
+
+def open_text(path, compression: str | None = None):
+    # A text handle that compresses as it writes; nothing is buffered whole.
+    check_compression(compression)
+    if compression == "gzip":
+        return gzip.open(path, "wt", encoding="utf-8", newline="")
+    if compression == "zstd":
+        writer = zstandard.ZstdCompressor().stream_writer(open(path, "wb"))
+        return io.TextIOWrapper(writer, encoding="utf-8", newline="")
+    return open(path, "w", encoding="utf-8", newline="")
+
+
+class JsonLinesWriter:
+    # One JSON object per line: a record per page, per product and per table
+    # row, each written the moment its page arrives.
+
+    def __init__(self, path, compression: str | None = None):
+        self.path = Path(path)
+        self.file = open_text(path, compression)
+        self.records = 0
+        self.tables = 0
+
+    def write(self, record: dict):
+        self.file.write(json.dumps(record, ensure_ascii=False))
+        self.file.write("\n")
+        self.records += 1
+
+    def write_page(self, record: dict):
+        page = record.get("page")
+        self.write({k: v for k, v in record.items() if k not in ["products", "tables"]})
+
+        for product in record.get("products", []):
+            self.write({"type": "product", "page": page, **product})
+
+        for table in record.get("tables", []):
+            self.tables += 1
+            self.write({"type": "table", "table": self.tables, "page": page, "headers": table.get("headers", [])})
+            for row in table["rows"]:
+                self.write({"type": "table_row", "table": self.tables, "cells": row})
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TableArchive:
+    # Every table of a crawl in one zip, one CSV/TSV member per table plus an
+    # index.csv. Each member is written and closed as soon as it is added.
+
+    def __init__(self, path, table_format: str = "csv"):
+        if table_format not in TABLE_FORMATS:
+            raise ValueError(f"Unknown table format: {table_format}")
+        self.path = Path(path)
+        self.format = table_format
+        self.zip = zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED)
+        self.index = []
+
+    def add(self, table: dict, source: str = ""):
+        self.add_rows(table.get("headers"), table["rows"], source)
+
+    def add_rows(self, headers: list, rows, source: str = "") -> int:
+        # rows can be any iterable; each one is written as it is produced.
+        name = f"table_{len(self.index) + 1:04d}.{self.format}"
+        count = 0
+        with io.TextIOWrapper(self.zip.open(name, "w"), encoding="utf-8", newline="") as f:
+            writer = csv.writer(f, delimiter=TABLE_FORMATS[self.format])
+            if headers:
+                writer.writerow(headers)
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        self.index.append([name, source, count])
+        return count
+
+    def sink(self, source: str = ""):
+        # For TablesExtractor(sink=...): stream a page's tables straight in.
+        return lambda headers, rows: self.add_rows(headers, rows, source)
+
+    def close(self):
+        with io.TextIOWrapper(self.zip.open("index.csv", "w"), encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["file", "source_url", "rows"])
+            writer.writerows(self.index)
+        self.zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ExportRun:
+    # Everything one crawl exports, under its own run directory and fed one
+    # page record at a time: JSON Lines (optionally compressed), a table
+    # archive and the plain-text content.
+
+    def __init__(self, base="exports", compression: str | None = "gzip", table_format: str = "csv", run_id: str | None = None):
+        check_compression(compression)
+        self.dir = run_dir(base, run_id)
+        self.id = self.dir.name
+        self.jsonl = JsonLinesWriter(self.dir / f"output.jsonl{COMPRESSION_SUFFIXES[compression]}", compression)
+        self.tables = TableArchive(self.dir / "tables.zip", table_format)
+        self.text = open(self.dir / "output.txt", "w", encoding="utf-8")
+        self.text_blocks = 0
+
+    def _text(self, block: str, sep: str):
+        if self.text_blocks:
+            self.text.write(sep)
+        self.text.write(block)
+        self.text_blocks += 1
+
+    @timed("export")
+    def add_page(self, record: dict):
+        self.jsonl.write_page(record)
+        for table in record.get("tables", []):
+            self.tables.add(table, record.get("url", ""))
+
+        if record.get("content"):
+            self._text(record["content"], "\n\n")
+        if record.get("products"):
+            self._text("\n".join(f"{p['title']} - {p['price']}" for p in record["products"]), "\n")
+
+    def close(self) -> dict:
+        self.jsonl.close()
+        self.tables.close()
+        self.text.close()
+        return {
+            "run": self.id,
+            "files": {
+                "jsonl": self.jsonl.path.name,
+                "tables": self.tables.path.name,
+                "txt": "output.txt"
+            }
+        }
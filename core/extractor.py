@@ -1,40 +1,63 @@
+import lxml.html
 from readability import Document
-from bs4 import BeautifulSoup
-from core.cleaner import clean_html, clean_text
+from core.cleaner import clean_tree, parse_html, text_of, clean_text
+from core.visitor import Extractor
+from core.timing import timed
 
+HEADING_TAGS = ("h1", "h2", "h3", "h4", "h5", "h6")
 
-def extract_metadata(soup: BeautifulSoup) -> dict:
-    title = soup.title.string.strip() if soup.title else ""
 
-    description = ""
-    meta = soup.find("meta", attrs={"name": "description"})
-    if meta and meta.get("content"):
-        description = meta["content"].strip()
+class MetadataExtractor(Extractor):
+    tags = ("title", "meta")
 
-    return {
-        "title": title,
-        "description": description
-    }
+    def __init__(self):
+        self.title = None
+        self.description = None
 
+    def visit(self, el):
+        if el.tag == "title":
+            if self.title is None:
+                self.title = el.text_content().strip()
+        elif self.description is None and el.get("name") == "description":
+            self.description = (el.get("content") or "").strip()
 
-def extract_headings(soup: BeautifulSoup) -> dict:
-    headings = {}
+    def result(self) -> dict:
+        return {
+            "title": self.title or "",
+            "description": self.description or ""
+        }
 
-    for level in range(1, 7):
-        tag = f"h{level}"
-        headings[tag] = [
-            h.get_text(strip=True)
-            for h in soup.find_all(tag)
-        ]
 
-    return headings
+class HeadingsExtractor(Extractor):
+    tags = HEADING_TAGS
+    streamable = True
 
+    def __init__(self):
+        self.headings = {tag: [] for tag in HEADING_TAGS}
 
-def extract_main_content(html: str) -> str:
+    def visit(self, h):
+        self.headings[h.tag].append(text_of(h))
+
+    def result(self) -> dict:
+        return self.headings
+
+
+def extract_metadata(root: lxml.html.HtmlElement) -> dict:
+    return MetadataExtractor().run(root)
+
+
+def extract_headings(root: lxml.html.HtmlElement) -> dict:
+    return HeadingsExtractor().run(root)
+
+
+@timed("readability")
+def extract_main_content(html) -> str:
+    # Accepts raw HTML or an already parsed tree; readability drops hidden
+    # elements from a tree in place, then works on a deep copy of it.
     doc = Document(html)
     content_html = doc.summary(html_partial=True)
 
-    soup = clean_html(content_html)
-    text = soup.get_text(separator="\n")
+    root = clean_tree(parse_html(content_html))
+    text = "\n".join(root.itertext())
 
     return clean_text(text)
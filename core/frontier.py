@@ -0,0 +1,159 @@
+import glob
+import hashlib
+import heapq
+import json
+import math
+import os
+from collections import deque
+from core.urls import canonicalize_url, url_host
+
+
+def _hashes(key: str) -> tuple:
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+    return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+
+
+class BloomFilter:
+    # Fixed-size seen-set: memory depends only on capacity and error rate
+    # (about 1.2 bytes per URL at 1%), never on how many URLs were added.
+    # False positives mean a small share of new URLs is skipped; nothing
+    # already seen is ever crawled twice.
+
+    def __init__(self, capacity: int, error_rate: float = 0.01, bits: bytearray | None = None, count: int = 0):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.count = count
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bits if bits is not None else bytearray((self.size + 7) // 8)
+
+    def _positions(self, hashes: tuple):
+        h1, h2 = hashes
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def contains(self, hashes: tuple) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(hashes))
+
+    def insert(self, hashes: tuple):
+        for p in self._positions(hashes):
+            self.bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+
+class GrowingBloomFilter:
+    # A chain of Bloom filters that starts small: when the newest one holds
+    # its capacity, a filter twice as large with half the error rate is
+    # added, so memory follows the URLs actually seen and the combined
+    # false-positive rate stays under error_rate.
+
+    def __init__(self, initial: int = 10_000, error_rate: float = 0.01, filters: list | None = None):
+        self.error_rate = error_rate
+        self.filters = filters or [BloomFilter(initial, error_rate / 2)]
+
+    def __contains__(self, key: str) -> bool:
+        hashes = _hashes(key)
+        return any(f.contains(hashes) for f in self.filters)
+
+    def add(self, key: str) -> bool:
+        # True if the key was new.
+        hashes = _hashes(key)
+        if any(f.contains(hashes) for f in self.filters):
+            return False
+        last = self.filters[-1]
+        if last.count >= last.capacity:
+            last = BloomFilter(last.capacity * 2, last.error_rate / 2)
+            self.filters.append(last)
+        last.insert(hashes)
+        return True
+
+
+class Frontier:
+    # URLs waiting to be crawled, one priority queue per domain. pop() goes
+    # round-robin over domains; within a domain higher priority comes first,
+    # then shallower depth, then discovery order.
+
+    def __init__(self, initial: int = 10_000, error_rate: float = 0.01, seen: GrowingBloomFilter | None = None):
+        self.seen = seen or GrowingBloomFilter(initial, error_rate)
+        self.queues = {}
+        self.domains = deque()
+        self.seq = 0
+        self.added = 0
+
+    def __len__(self):
+        return sum(len(q) for q in self.queues.values())
+
+    def push(self, url: str, depth: int = 0, priority: int = 0) -> bool:
+        url = canonicalize_url(url)
+        if not url.startswith(("http://", "https://")) or not self.seen.add(url):
+            return False
+
+        domain = url_host(url)
+        if not self.queues.get(domain):
+            self.queues[domain] = []
+            self.domains.append(domain)
+        self.seq += 1
+        self.added += 1
+        heapq.heappush(self.queues[domain], (-priority, depth, self.seq, url))
+        return True
+
+    def pop(self) -> tuple | None:
+        while self.domains:
+            domain = self.domains.popleft()
+            queue = self.queues[domain]
+            if not queue:
+                continue
+            _, depth, _, url = heapq.heappop(queue)
+            if queue:
+                self.domains.append(domain)
+            else:
+                del self.queues[domain]
+            return url, depth
+        return None
+
+    def save(self, path: str):
+        # Queues go to JSON and the seen-set bits to a sidecar named after
+        # seq, which the JSON points to. The sidecar is written first and
+        # the JSON swapped in last, so a crash at any point leaves the
+        # previous JSON next to the sidecar it was saved with.
+        sidecar = f"{path}.{self.seq}.bloom"
+        state = {
+            "error_rate": self.seen.error_rate,
+            "filters": [[f.capacity, f.error_rate, f.count] for f in self.seen.filters],
+            "bloom": os.path.basename(sidecar),
+            "seq": self.seq,
+            "added": self.added,
+            "domains": list(self.domains),
+            "queues": self.queues
+        }
+        with open(sidecar + ".tmp", "wb") as f:
+            for bloom in self.seen.filters:
+                f.write(bloom.bits)
+        os.replace(sidecar + ".tmp", sidecar)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(path + ".tmp", path)
+
+        # Sidecars of earlier saves are no longer referenced.
+        for old in glob.glob(glob.escape(path) + ".*.bloom"):
+            if old != sidecar:
+                os.remove(old)
+
+    @classmethod
+    def load(cls, path: str) -> "Frontier":
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+        filters = []
+        with open(os.path.join(os.path.dirname(path), state["bloom"]), "rb") as f:
+            for capacity, error_rate, count in state["filters"]:
+                bloom = BloomFilter(capacity, error_rate, count=count)
+                bloom.bits = bytearray(f.read(len(bloom.bits)))
+                filters.append(bloom)
+
+        frontier = cls(seen=GrowingBloomFilter(error_rate=state["error_rate"], filters=filters))
+        frontier.seq = state["seq"]
+        frontier.added = state["added"]
+        frontier.domains = deque(state["domains"])
+        frontier.queues = {d: [tuple(e) for e in q] for d, q in state["queues"].items()}
+        for queue in frontier.queues.values():
+            heapq.heapify(queue)
+        return frontier
@@ -1,27 +1,153 @@
-from bs4 import BeautifulSoup
+import re
+import lxml.html
 from urllib.parse import urljoin
+from core.cleaner import text_of
+from core.stream import stream_extract
+from core.visitor import Extractor
 
 
 NEXT_KEYWORDS = ["next", "older", "›", "»", "next page", "forward", "continue"]
+LAST_KEYWORDS = ["last", "last page", "last »", "»»", "last »»"]
+PAGE_OF = re.compile(r"page\s+(\d+)\s+of\s+(\d+)", re.I)
+NUMBER = re.compile(r"\d+")
 
 
-def find_next_page(soup: BeautifulSoup, base_url: str) -> str | None:
-    # 1. Standard rel="next"
-    link = soup.find("a", rel="next")
-    if link and link.get("href"):
-        return urljoin(base_url, link["href"])
+class NextPageExtractor(Extractor):
+    tags = ("a",)
+    streamable = True
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self.rel_next = None
+        self.rel_seen = False
+        self.keyword_next = None
+
+    def visit(self, a):
+        # 1. Standard rel="next" (only the first one counts)
+        if not self.rel_seen and "next" in (a.get("rel") or "").split():
+            self.rel_seen = True
+            self.rel_next = a.get("href") or None
+
+        # 2. More precise keyword-based detection
+        if self.keyword_next is not None or a.get("href") is None:
+            return
+        text = text_of(a).lower()
 
-    # 2. More precise keyword-based detection
-    for a in soup.find_all("a", href=True):
-        text = a.get_text(strip=True).lower()
-        
         # Match exact word or common patterns
         if any(k == text or f" {k} " in f" {text} " for k in NEXT_KEYWORDS):
-            return urljoin(base_url, a["href"])
-        
+            self.keyword_next = a.get("href")
+            return
+
         # Check classes or IDs for pagination hints
-        classes = " ".join(a.get("class", [])).lower()
+        classes = " ".join((a.get("class") or "").split()).lower()
         if "next" in classes or "pagination-next" in classes:
-            return urljoin(base_url, a["href"])
+            self.keyword_next = a.get("href")
+
+    def result(self) -> str | None:
+        href = self.rel_next if self.rel_next is not None else self.keyword_next
+        return urljoin(self.base_url, href) if href is not None else None
+
+
+def find_next_page(root: lxml.html.HtmlElement, base_url: str) -> str | None:
+    return NextPageExtractor(base_url).run(root)
+
+
+class PaginationExtractor(Extractor):
+    # Evidence for infer_template(): numbered page links ("2", "3", ...),
+    # a "Last" link and a "Page X of Y" marker.
+    tags = ("a", "li", "span")
+    streamable = True
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self.numbered = {}
+        self.last_url = None
+        self.page_of = None
+
+    def visit(self, el):
+        text = text_of(el)
+        if len(text) > 40:
+            return
+
+        if el.tag != "a":
+            if self.page_of is None:
+                match = PAGE_OF.search(text)
+                if match:
+                    self.page_of = (int(match.group(1)), int(match.group(2)))
+            return
+
+        href = el.get("href")
+        if not href:
+            return
+        if text.isascii() and text.isdigit():
+            self.numbered.setdefault(int(text), urljoin(self.base_url, href))
+        elif self.last_url is None and text.lower() in LAST_KEYWORDS:
+            self.last_url = urljoin(self.base_url, href)
+
+    def result(self) -> dict:
+        return {"numbered": self.numbered, "last_url": self.last_url, "page_of": self.page_of}
+
+
+def scan_pagination(html: str, base_url: str) -> dict:
+    # Same next link as find_next_page() on the cleaned tree, from a tree-less
+    # pass over the raw HTML, so the next fetch can start before extraction.
+    found = stream_extract(html, {
+        "next_page": NextPageExtractor(base_url),
+        "pagination": PaginationExtractor(base_url)
+    })
+    return {"next_page": found["next_page"], **found["pagination"]}
+
+
+def template_url(template: dict, number: int) -> str:
+    return f"{template['prefix']}{number}{template['suffix']}"
+
+
+def template_number(template: dict, url: str | None) -> int | None:
+    if not url or not url.startswith(template["prefix"]) or not url.endswith(template["suffix"]):
+        return None
+    middle = url[len(template["prefix"]):len(url) - len(template["suffix"])]
+    return int(middle) if middle.isascii() and middle.isdigit() else None
+
+
+def infer_template(url: str, scan: dict) -> dict | None:
+    # Find the number in the next link that, swapped for n, reproduces the
+    # page's other numbered links (page-2.html, ?page=3, /p/4). A single next
+    # link is only trusted when something else on the page agrees with it.
+    next_url = scan["next_page"]
+    if not next_url:
+        return None
+
+    for match in reversed(list(NUMBER.finditer(next_url))):
+        if match.group() != str(int(match.group())):
+            continue  # zero-padded; str(n) would not round-trip
+        template = {"prefix": next_url[:match.start()], "suffix": next_url[match.end():]}
+        next_number = int(match.group())
+
+        # Page 1 is often the bare listing URL, so it is allowed to differ.
+        numbered = {n: u for n, u in scan["numbered"].items() if n > 1}
+        if any(template_url(template, n) != u for n, u in numbered.items()):
+            continue
+
+        confirmed = (
+            any(n != next_number for n in numbered)
+            or template_number(template, url) == next_number - 1
+            or (scan["page_of"] is not None and scan["page_of"][0] + 1 == next_number)
+        )
+        if not confirmed:
+            continue
+
+        last = template_number(template, scan["last_url"])
+        if last is None and scan["page_of"] is not None:
+            last = scan["page_of"][1]
+
+        template["current"] = next_number - 1
+        template["last"] = last
+        return template
 
     return None
+
+
+def visible_last(template: dict, scan: dict, current: int) -> int:
+    # Highest page this page's numbered links show under the template.
+    numbers = [n for n, u in scan["numbered"].items() if template_url(template, n) == u]
+    return max(numbers, default=current + 1)
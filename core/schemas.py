@@ -0,0 +1,215 @@
+import hashlib
+import json
+import re
+from functools import lru_cache
+from lxml import etree
+from core.urls import resolve_url
+from core.visitor import Extractor
+
+try:
+    from cssselect import HTMLTranslator
+except ImportError:  # CSS selectors are optional; XPath always works
+    HTMLTranslator = None
+
+# A schema describes one kind of listing page:
+#
+#   {
+#     "name": "books",
+#     "urls": ["books.toscrape.com/", "*.example.com/shop/"],
+#     "items": {"css": "article.product_pod"},
+#     "fields": {
+#       "title": {"xpath": ".//h3/a", "attr": "title"},
+#       "rating": {"css": "p.star-rating", "attr": "class", "regex": "star-rating\\s+(\\w+)"},
+#       "url": {"css": "h3 a", "attr": "href", "url": true},
+#       "tags": {"css": ".tag", "all": true}
+#     },
+#     "required": ["title"]
+#   }
+#
+# "urls" are host + path prefixes ("*." matches any subdomain). A field is
+# the element's normalized text, or an attribute with "attr"; "regex" keeps
+# the first group, "url" resolves against the page URL and "all" returns
+# every match instead of the first. Items missing a required field are
+# dropped. Everything is compiled once into lxml XPath objects.
+
+ATTR_NAME = re.compile(r"[\w:-]+")
+# cssselect's exact test for ".name"; most elements fail a plain substring
+# check, which is much cheaper than building the padded string.
+CLASS_TEST = re.compile(r"contains\(concat\(' ', normalize-space\(@class\), ' '\), ' ([^' ]+) '\)")
+
+BOOKS_SCHEMA = {
+    "name": "books",
+    "urls": ["books.toscrape.com/"],
+    "items": {"xpath": "//article[contains(concat(' ', normalize-space(@class), ' '), ' product_pod ')]"},
+    "fields": {
+        "title": {"xpath": ".//h3//a", "attr": "title"},
+        "price": {"xpath": ".//*[contains(concat(' ', normalize-space(@class), ' '), ' price_color ')]"},
+        "rating": {"xpath": ".//p", "attr": "class", "regex": r"^\S+\s+(\S+)"},
+        "url": {"xpath": ".//h3//a", "attr": "href", "url": True}
+    },
+    "required": ["title", "price", "rating", "url"]
+}
+
+
+class Field:
+
+    def __init__(self, name: str, spec: dict):
+        if not isinstance(spec, dict):
+            raise ValueError(f"Field '{name}' must be an object")
+        path = selector_xpath(spec, relative=True)
+        attr = spec.get("attr")
+        if attr is not None and not ATTR_NAME.fullmatch(attr):
+            raise ValueError(f"Field '{name}': invalid attribute name {attr!r}")
+
+        self.name = name
+        self.all = bool(spec.get("all"))
+        self.url = bool(spec.get("url"))
+        try:
+            self.regex = re.compile(spec["regex"]) if spec.get("regex") else None
+        except re.error as e:
+            raise ValueError(f"Field '{name}': invalid regex: {e}")
+        # One XPath call per item and field, returning strings straight from libxml2.
+        # smart_strings=False: plain str results, no back-reference to the tree.
+        if self.all:
+            self.xpath = etree.XPath(f"({path})/@{attr}" if attr else f"({path})", smart_strings=False)
+        elif attr:
+            self.xpath = etree.XPath(f"string(({path})[1]/@{attr})", smart_strings=False)
+        else:
+            self.xpath = etree.XPath(f"normalize-space(({path})[1])", smart_strings=False)
+
+    def clean(self, value: str, base_url: str):
+        value = value.strip()
+        if value and self.regex:
+            match = self.regex.search(value)
+            value = (match.group(1) if match.groups() else match.group(0)) if match else ""
+        if value and self.url:
+            value = resolve_url(base_url, value)
+        return value or None
+
+    def extract(self, item, base_url: str):
+        if not self.all:
+            return self.clean(self.xpath(item), base_url)
+        values = []
+        for match in self.xpath(item):
+            text = match if isinstance(match, str) else " ".join(match.text_content().split())
+            value = self.clean(text, base_url)
+            if value is not None:
+                values.append(value)
+        return values
+
+
+class Schema:
+
+    def __init__(self, spec: dict):
+        if not spec.get("name") or not spec.get("urls") or not spec.get("items") or not spec.get("fields"):
+            raise ValueError("A schema needs 'name', 'urls', 'items' and 'fields'")
+        if not isinstance(spec["name"], str) or not isinstance(spec["urls"], list) \
+                or not all(isinstance(u, str) for u in spec["urls"]):
+            raise ValueError("'name' must be a string and 'urls' a list of strings")
+        if not isinstance(spec["items"], dict) or not isinstance(spec["fields"], dict):
+            raise ValueError("'items' and 'fields' must be objects")
+
+        self.name = spec["name"]
+        self.urls = list(spec["urls"])
+        self.spec = spec
+        self.digest = hashlib.blake2b(json.dumps(spec, sort_keys=True).encode(), digest_size=8).hexdigest()
+        self.items = etree.XPath(selector_xpath(spec["items"], relative=False))
+        self.fields = [Field(name, field) for name, field in spec["fields"].items()]
+        self.required = set(spec.get("required", []))
+        unknown = self.required - set(spec["fields"])
+        if unknown:
+            raise ValueError(f"Required fields are not defined: {sorted(unknown)}")
+
+    def extract(self, root, base_url: str) -> list:
+        found = []
+        for item in self.items(root):
+            row = {field.name: field.extract(item, base_url) for field in self.fields}
+            if all(row[name] for name in self.required) and any(row.values()):
+                found.append(row)
+        return found
+
+
+def _quick_class_test(match) -> str:
+    return f"(contains(@class, '{match.group(1)}') and {match.group(0)})"
+
+
+def selector_xpath(spec: dict, relative: bool) -> str:
+    if "xpath" in spec:
+        path = spec["xpath"]
+    elif "css" in spec:
+        if HTMLTranslator is None:
+            raise ValueError("CSS selectors need the cssselect package; use 'xpath' instead")
+        prefix = "descendant-or-self::" if relative else "//"
+        try:
+            path = HTMLTranslator().css_to_xpath(spec["css"], prefix=prefix)
+        except Exception as e:
+            raise ValueError(f"Invalid CSS selector {spec['css']!r}: {e}")
+        path = CLASS_TEST.sub(_quick_class_test, path)
+    else:
+        raise ValueError("A selector needs 'css' or 'xpath'")
+
+    if not isinstance(path, str):
+        raise ValueError("Selectors must be strings")
+    try:
+        etree.XPath(path)
+    except etree.XPathSyntaxError as e:
+        raise ValueError(f"Invalid selector {path!r}: {e}")
+    return path
+
+
+@lru_cache(maxsize=256)
+def _compile(spec_json: str) -> Schema:
+    return Schema(json.loads(spec_json))
+
+
+def compile_schema(spec: dict) -> Schema:
+    # Cached on the spec itself, so reloading an unchanged registry is free.
+    return _compile(json.dumps(spec))
+
+
+def url_key(url: str) -> tuple:
+    # "https://Shop.example.com:8080/a/b?x" -> ("shop.example.com:8080", "/a/b")
+    rest = url.split("://", 1)[-1]
+    host, _, path = rest.partition("/")
+    path = "/" + path.split("?", 1)[0].split("#", 1)[0]
+    return host.lower(), path
+
+
+class SchemaIndex:
+    # Host -> [(path prefix, schema)], longest prefix first. Wildcard hosts
+    # ("*.example.com") are looked up by walking up the URL's domain labels.
+
+    def __init__(self, schemas: list):
+        self.hosts = {}
+        for schema in schemas:
+            for pattern in schema.urls:
+                host, path = url_key(pattern)
+                self.hosts.setdefault(host, []).append((path, schema))
+        for entries in self.hosts.values():
+            entries.sort(key=lambda entry: len(entry[0]), reverse=True)
+
+    def match(self, url: str) -> Schema | None:
+        host, path = url_key(url)
+        candidates = [host]
+        labels = host.split(".")
+        candidates += ["*." + ".".join(labels[i:]) for i in range(1, len(labels))]
+        for candidate in candidates:
+            for prefix, schema in self.hosts.get(candidate, []):
+                if path.startswith(prefix):
+                    return schema
+        return None
+
+
+class SchemaExtractor(Extractor):
+    whole_tree = True
+
+    def __init__(self, schema: Schema, base_url: str = ""):
+        self.schema = schema
+        self.base_url = base_url
+        self.items = []
+
+    def visit(self, root):
+        self.items = self.schema.extract(root, self.base_url)
+
+    def result(self) -> list:
+        return self.items
@@ -0,0 +1,107 @@
+from lxml import etree
+from core.cleaner import REMOVE_TAGS
+from core import timing
+
+
+class StreamElement(dict):
+    # Just enough of an lxml element for streamable extractors: the attributes
+    # (so .get() stays a C-level dict lookup), the tag, and the element's
+    # stripped text already joined the way text_of() would.
+    __slots__ = ("tag", "text")
+
+    def __init__(self, tag: str, attrib, text: str):
+        super().__init__(attrib)
+        self.tag = tag
+        self.text = text
+
+    def __len__(self):
+        return 0  # no children, so text_of() takes its fast path
+
+
+class StreamTarget:
+    # lxml parser target: sees SAX-style events and never builds a tree.
+    # Subtrees under REMOVE_TAGS are skipped, mirroring clean_tree().
+
+    def __init__(self, extractors: dict):
+        self.extractors = extractors
+        self.spent = {} if timing.extractor_timing_enabled() else None
+        self.handlers = {}
+        for name, extractor in extractors.items():
+            visit = extractor.visit if self.spent is None else timing.timed_visit(extractor.visit, name, self.spent)
+            for tag in extractor.tags:
+                self.handlers.setdefault(tag, []).append(visit)
+
+        self.stack = []
+        self.open_frames = []
+        self.skip_depth = 0
+        self.pending = []
+
+    def _flush(self):
+        # libxml2 may split one text node into several data() calls
+        text = "".join(self.pending).strip()
+        self.pending = []
+        if text:
+            for frame in self.open_frames:
+                frame[2].append(text)
+
+    def start(self, tag, attrib):
+        if self.pending:
+            self._flush()
+        if self.skip_depth or tag in REMOVE_TAGS:
+            self.skip_depth += 1
+            return
+
+        frame = None
+        if tag in self.handlers:
+            frame = (tag, attrib, [])
+            self.open_frames.append(frame)
+        self.stack.append(frame)
+
+    def end(self, tag):
+        if self.pending:
+            self._flush()
+        if self.skip_depth:
+            self.skip_depth -= 1
+            return
+        if not self.stack:
+            return
+
+        frame = self.stack.pop()
+        if frame is None:
+            return
+
+        self.open_frames.pop()
+        el = StreamElement(frame[0], frame[1], "".join(frame[2]))
+        for visit in self.handlers[frame[0]]:
+            visit(el)
+
+    def data(self, data):
+        # Text only matters inside an element some extractor is collecting.
+        if self.open_frames and not self.skip_depth:
+            self.pending.append(data)
+
+    def comment(self, text):
+        if self.pending:
+            self._flush()
+
+    def close(self) -> dict:
+        self._flush()
+        if self.spent:
+            timing.record_extractors(self.spent)
+        return {name: extractor.result() for name, extractor in self.extractors.items()}
+
+
+def is_streamable(extractors: dict) -> bool:
+    return all(extractor.streamable for extractor in extractors.values())
+
+
+@timing.timed("stream_extract")
+def stream_extract(html: str, extractors: dict) -> dict:
+    target = StreamTarget(extractors)
+    parser = etree.HTMLParser(target=target)
+    try:
+        parser.feed(html)
+    except ValueError:
+        parser = etree.HTMLParser(target=StreamTarget(extractors), encoding="utf-8")
+        parser.feed(html.encode("utf-8"))
+    return parser.close()
@@ -1,72 +1,108 @@
-from bs4 import BeautifulSoup
-from urllib.parse import urlparse, urljoin
+import lxml.html
+from core.cleaner import text_of
+from core.tables import parse_table
+from core.urls import resolve_url, url_host
+from core.visitor import Extractor
+
+
+class TablesExtractor(Extractor):
+    tags = ("table",)
+
+    def __init__(self, sink=None):
+        # sink(headers, rows) -> row count takes each table's rows as they are
+        # built (e.g. TableArchive.add_rows); only a summary is kept then.
+        self.sink = sink
+        self.tables = []
+
+    def visit(self, table):
+        parsed = parse_table(table)
+        if parsed is None:
+            return
+        headers, rows = parsed
+
+        if self.sink is None:
+            self.tables.append({"headers": headers, "rows": list(rows)})
+        else:
+            self.tables.append({"headers": headers, "row_count": self.sink(headers, rows)})
 
+    def result(self) -> list:
+        return self.tables
 
-def extract_tables(soup: BeautifulSoup) -> list:
-    tables = []
 
-    for table in soup.find_all("table"):
-        rows = []
-        headers = []
+class ListsExtractor(Extractor):
+    tags = ("ul", "ol")
 
-        thead = table.find("thead")
-        if thead:
-            headers = [th.get_text(strip=True) for th in thead.find_all("th")]
+    def __init__(self):
+        self.lists = []
 
-        tbody = table.find("tbody") or table
-        for tr in tbody.find_all("tr"):
-            cells = [td.get_text(strip=True) for td in tr.find_all(["td", "th"])]
-            if cells:
-                rows.append(cells)
+    def visit(self, ul):
+        items = [text_of(li) for li in ul.iter("li")]
+        if len(items) > 1:
+            self.lists.append(items)
 
-        if rows:
-            tables.append({
-                "headers": headers,
-                "rows": rows
-            })
+    def result(self) -> list:
+        return self.lists
 
-    return tables
 
+class LinksExtractor(Extractor):
+    tags = ("a",)
+    streamable = True
 
-def extract_lists(soup: BeautifulSoup) -> list:
-    lists = []
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self.base_domain = url_host(base_url)
+        self.internal = []
+        self.external = []
 
-    for ul in soup.find_all(["ul", "ol"]):
-        items = [li.get_text(strip=True) for li in ul.find_all("li")]
-        if len(items) > 1:
-            lists.append(items)
+    def visit(self, a):
+        if a.get("href") is None:
+            return
+        href = resolve_url(self.base_url, a.get("href"))
+        domain = url_host(href)
 
-    return lists
+        if domain == self.base_domain:
+            self.internal.append(href)
+        else:
+            self.external.append(href)
 
+    def result(self) -> dict:
+        return {
+            "internal": list(dict.fromkeys(self.internal)),
+            "external": list(dict.fromkeys(self.external))
+        }
 
-def extract_links(soup: BeautifulSoup, base_url: str) -> dict:
-    internal = []
-    external = []
 
-    base_domain = urlparse(base_url).netloc
+class ImagesExtractor(Extractor):
+    tags = ("img",)
+    streamable = True
 
-    for a in soup.find_all("a", href=True):
-        href = urljoin(base_url, a["href"])
-        domain = urlparse(href).netloc
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self.images = []
 
-        if domain == base_domain:
-            internal.append(href)
-        else:
-            external.append(href)
+    def visit(self, img):
+        if img.get("src") is None:
+            return
+        self.images.append({
+            "src": resolve_url(self.base_url, img.get("src")),
+            "alt": img.get("alt", "").strip()
+        })
 
-    return {
-        "internal": list(set(internal)),
-        "external": list(set(external))
-    }
+    def result(self) -> list:
+        return self.images
 
 
-def extract_images(soup: BeautifulSoup, base_url: str) -> list:
-    images = []
+def extract_tables(root: lxml.html.HtmlElement) -> list:
+    return TablesExtractor().run(root)
+
+
+def extract_lists(root: lxml.html.HtmlElement) -> list:
+    return ListsExtractor().run(root)
+
+
+def extract_links(root: lxml.html.HtmlElement, base_url: str) -> dict:
+    return LinksExtractor(base_url).run(root)
 
-    for img in soup.find_all("img", src=True):
-        images.append({
-            "src": urljoin(base_url, img["src"]),
-            "alt": img.get("alt", "").strip()
-        })
 
-    return images
+def extract_images(root: lxml.html.HtmlElement, base_url: str) -> list:
+    return ImagesExtractor(base_url).run(root)
@@ -0,0 +1,211 @@
+import re
+from itertools import chain
+from lxml import etree
+from core.cleaner import text_of
+
+# Turns one <table> element into headers plus a lazy stream of rows, laid
+# out on the grid a browser would draw: rowspan/colspan cells are repeated
+# into every slot they cover. Nested tables are left out of their parent's
+# cells; the tree walk visits them as tables of their own.
+
+# Limits from the HTML spec; rowspan="0" runs to the end of its row group
+# and colspan="0" counts as 1.
+MAX_COLSPAN = 1000
+MAX_ROWSPAN = 65534
+# Leading all-<th> rows beyond this are treated as data, so a table made
+# only of <th> cells is never buffered whole while looking for its header.
+MAX_HEADER_ROWS = 4
+SECTIONS = ("thead", "tbody", "tfoot")
+DIGITS = re.compile(r"\s*(\d+)")
+# One libxml2 scan per table; tables without spans take the plain row path.
+HAS_SPANS = etree.XPath(
+    "boolean((tr | */tr)/*/@*[local-name() = 'rowspan' or local-name() = 'colspan'])"
+)
+
+
+def span(value: str | None, limit: int, zero: int) -> int:
+    match = DIGITS.match(value) if value is not None else None
+    if match is None:
+        return 1
+    n = int(match.group(1))
+    return min(n, limit) if n else zero
+
+
+def text_outside_tables(el, parts: list):
+    if el.text:
+        parts.append(el.text.strip())
+    for child in el:
+        if isinstance(child.tag, str) and child.tag != "table":
+            text_outside_tables(child, parts)
+        if child.tail:
+            parts.append(child.tail.strip())
+
+
+def cell_text(cell) -> str:
+    # text_of() without the text of any table nested in the cell.
+    parts = []
+    text_outside_tables(cell, parts)
+    return "".join(parts)
+
+
+def table_rows(table):
+    # Yields (row group, tr) for the table's own rows. <tr>s sitting directly
+    # in the table (all libxml2 gives us when the markup has no <tbody>) have
+    # the table itself as their group.
+    for child in table.iterchildren():
+        if child.tag == "tr":
+            yield table, child
+        elif child.tag in SECTIONS:
+            for tr in child.iterchildren("tr"):
+                yield child, tr
+
+
+def grid_rows(table, header_rows: list):
+    # Yields each row's cells. Leading header rows (<thead> rows and rows made
+    # only of <th> cells) go into header_rows instead; once a data row has
+    # been seen the check is skipped. Header-looking rows past
+    # MAX_HEADER_ROWS are held back until a <td> row shows up; if none ever
+    # does, the table is <th>-only and every row is left in header_rows for
+    # parse_table to hand out as data.
+    nested = table.find(".//table") is not None
+    if not nested and not HAS_SPANS(table):
+        return plain_rows(table, header_rows)
+    return spanned_rows(table, header_rows, cell_text if nested else text_of)
+
+
+def add_header_row(group, tr, cells: list, header_rows: list, overflow: list) -> bool:
+    if group.tag != "thead" and tr.find("td") is not None:
+        return False
+    (header_rows if len(header_rows) < MAX_HEADER_ROWS else overflow).append(cells)
+    return True
+
+
+def plain_rows(table, header_rows: list):
+    # No spans and no nested tables: the grid is just each row's cells, with
+    # no row groups or pending spans to track.
+    leading = True
+    overflow = []
+    for tr, cells in flat_rows(table):
+        if leading:
+            if add_header_row(tr.getparent(), tr, cells, header_rows, overflow):
+                continue
+            leading = False
+            yield from overflow
+        yield cells
+
+    if leading:
+        header_rows.extend(overflow)
+
+
+def flat_rows(table):
+    # (tr, cells) from a single lxml iterator over the whole table: opening
+    # one iterator per row costs more than reading its cells. Only valid
+    # without nested tables, whose rows and cells the iterator would include.
+    tr = None
+    cells = []
+    for el in table.iter("tr", "td", "th"):
+        if el.tag == "tr":
+            if cells:
+                yield tr, cells
+            tr = el
+            cells = []
+        elif tr is not None:
+            cells.append(text_of(el))
+    if cells:
+        yield tr, cells
+
+
+def spanned_rows(table, header_rows: list, text):
+    leading = True
+    overflow = []
+    current = None
+    pending = {}  # column -> [rows left, text] for rowspans from rows above
+    for group, tr in table_rows(table):
+        if group is not current:
+            # Rowspans never reach past the end of their row group.
+            current = group
+            pending = {}
+        cells = spanned_cells(tr, pending, text)
+        if not cells:
+            continue
+
+        if leading:
+            if add_header_row(group, tr, cells, header_rows, overflow):
+                continue
+            leading = False
+            yield from overflow
+        yield cells
+
+    if leading:
+        header_rows.extend(overflow)
+
+
+def spanned_cells(tr, pending: dict, text) -> list:
+    cells = []
+    col = 0
+    for cell in tr.iterchildren("td", "th"):
+        if pending:
+            while col in pending:
+                col = fill_pending(cells, pending, col)
+        value = text(cell)
+        if not cell.keys():
+            cells.append(value)
+            col += 1
+            continue
+        colspan = span(cell.get("colspan"), MAX_COLSPAN, 1)
+        rowspan = span(cell.get("rowspan"), MAX_ROWSPAN, MAX_ROWSPAN)
+        for _ in range(colspan):
+            cells.append(value)
+            if rowspan > 1:
+                pending[col] = [rowspan - 1, value]
+            col += 1
+
+    if not cells:
+        # An empty <tr> still takes up a row for the spans above it.
+        for c in list(pending):
+            fill_pending([], pending, c)
+        return cells
+    # Spans from above that sit to the right of this row's own cells,
+    # padding any gap left by a short row in between.
+    while pending and col <= max(pending):
+        if col in pending:
+            col = fill_pending(cells, pending, col)
+        else:
+            cells.append("")
+            col += 1
+    return cells
+
+
+def fill_pending(cells: list, pending: dict, col: int) -> int:
+    left, text = pending[col]
+    cells.append(text)
+    if left > 1:
+        pending[col][0] = left - 1
+    else:
+        del pending[col]
+    return col + 1
+
+
+def merge_headers(rows: list) -> list:
+    # Stacked header rows become one header per column: "Passengers / 2023".
+    headers = []
+    for col in range(max(len(row) for row in rows)):
+        parts = []
+        for row in rows:
+            text = row[col] if col < len(row) else ""
+            if text and text not in parts:
+                parts.append(text)
+        headers.append(" / ".join(parts))
+    return headers
+
+
+def parse_table(table) -> tuple | None:
+    # (headers, rows), or None for a table without rows. rows is an iterator,
+    # so a caller that writes them out as they come never holds the table.
+    header_rows = []
+    rows = grid_rows(table, header_rows)
+    first = next(rows, None)
+    if first is None:
+        # Nothing but header-looking rows: a <th>-only table is still data.
+        return ([], iter(header_rows)) if header_rows else None
+    return (merge_headers(header_rows) if header_rows else []), chain([first], rows)
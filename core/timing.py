@@ -0,0 +1,85 @@
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+# Stage timing for the core modules. Durations are handed to whatever the
+# service layer installs with set_recorder() (services.metrics exports them
+# to Prometheus); without a recorder only the page's stage map is filled in.
+
+_local = threading.local()
+_recorder = {"stage": None, "extractors": None, "extractor_timing": None}
+
+
+def set_recorder(stage, extractors, extractor_timing):
+    # stage(name, seconds, mode), extractors(spent, mode), extractor_timing() -> bool
+    _recorder.update(stage=stage, extractors=extractors, extractor_timing=extractor_timing)
+
+
+def current_mode() -> str:
+    page = getattr(_local, "page", None)
+    return page["mode"] if page else ""
+
+
+@contextmanager
+def page_context(mode: str):
+    # Labels every stage timed on this thread with the scrape mode, and
+    # collects the stage durations (ms) for the page's meta.
+    previous = getattr(_local, "page", None)
+    _local.page = {"mode": mode, "stages": {}}
+    try:
+        yield _local.page["stages"]
+    finally:
+        _local.page = previous
+
+
+@contextmanager
+def stage(name: str):
+    # Only the outermost stage on a thread is recorded: readability's own
+    # re-parse counts as readability, not as parse.
+    if getattr(_local, "in_stage", False):
+        yield
+        return
+
+    _local.in_stage = True
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        _local.in_stage = False
+
+        page = getattr(_local, "page", None)
+        if _recorder["stage"] is not None:
+            _recorder["stage"](name, elapsed, page["mode"] if page else "")
+        if page:
+            page["stages"][name] = round(page["stages"].get(name, 0) + elapsed * 1000, 2)
+
+
+def timed(name: str):
+    # Decorator form of stage().
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def extractor_timing_enabled() -> bool:
+    check = _recorder["extractor_timing"]
+    return check() if check is not None else False
+
+
+def timed_visit(visit, name: str, spent: dict):
+    def wrapper(el):
+        start = time.perf_counter()
+        visit(el)
+        spent[name] = spent.get(name, 0) + time.perf_counter() - start
+    return wrapper
+
+
+def record_extractors(spent: dict):
+    if _recorder["extractors"] is not None:
+        _recorder["extractors"](spent, current_mode())
@@ -0,0 +1,46 @@
+from functools import lru_cache
+from urllib.parse import urljoin, urlsplit, urlunsplit, parse_qsl, urlencode
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# Query parameters that only identify the click, never the page.
+TRACKING_PARAMS = {
+    "gclid", "dclid", "gbraid", "wbraid", "fbclid", "msclkid", "yclid", "twclid",
+    "igshid", "mc_cid", "mc_eid", "_ga", "_gl", "_hsenc", "_hsmi", "mkt_tok", "ref_src"
+}
+TRACKING_PREFIXES = ("utm_", "pk_", "hsa_")
+
+
+def normalize_url(url: str) -> str:
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+
+@lru_cache(maxsize=65536)
+def canonicalize_url(url: str) -> str:
+    # normalize_url() plus tracking-parameter removal: the identity a crawl
+    # uses to decide whether two links are the same page.
+    parts = urlsplit(normalize_url(url))
+    query = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PREFIXES)
+    ]
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ""))
+
+
+# Pages repeat the same hrefs (nav, footers, pagers) many times over.
+@lru_cache(maxsize=8192)
+def resolve_url(base_url: str, href: str) -> str:
+    return urljoin(base_url, href)
+
+
+@lru_cache(maxsize=8192)
+def url_host(url: str) -> str:
+    return urlsplit(url).netloc
@@ -0,0 +1,46 @@
+import lxml.html
+from core import timing
+
+
+class Extractor:
+    # Subclasses list the tags they care about in `tags`; visit() is called for
+    # each of them in document order and result() once the walk is done.
+    # Extractors that only read an element's attributes and text_of() can set
+    # `streamable` and be served by core.stream without building a tree.
+    # Extractors that query the tree themselves (compiled XPath) set
+    # `whole_tree` and get a single visit() with the root instead.
+    tags = ()
+    streamable = False
+    whole_tree = False
+
+    def visit(self, el):
+        raise NotImplementedError
+
+    def result(self):
+        raise NotImplementedError
+
+    def run(self, root: lxml.html.HtmlElement):
+        return run_extractors(root, {"result": self})["result"]
+
+
+@timing.timed("extract")
+def run_extractors(root: lxml.html.HtmlElement, extractors: dict) -> dict:
+    # Per-extractor timing wraps every visit() call, so it is opt-in.
+    spent = {} if timing.extractor_timing_enabled() else None
+    handlers = {}
+    for name, extractor in extractors.items():
+        visit = extractor.visit if spent is None else timing.timed_visit(extractor.visit, name, spent)
+        if extractor.whole_tree:
+            visit(root)
+        for tag in extractor.tags:
+            handlers.setdefault(tag, []).append(visit)
+
+    # One walk of the tree, filtered to the registered tags inside lxml.
+    if handlers:
+        for el in root.iter(*handlers):
+            for visit in handlers[el.tag]:
+                visit(el)
+
+    if spent:
+        timing.record_extractors(spent)
+    return {name: extractor.result() for name, extractor in extractors.items()}
@@ -0,0 +1,126 @@
+import threading
+import weakref
+import requests
+from requests.adapters import HTTPAdapter
+from requests.cookies import RequestsCookieJar
+from urllib.parse import urlparse
+from urllib3.util.request import ACCEPT_ENCODING
+from services.data_manager import load_config
+
+# urllib3 advertises "br" only when a brotli decoder is importable, so the
+# header always matches what we can decode transparently.
+DEFAULT_HEADERS = {
+    "Accept-Encoding": ACCEPT_ENCODING,
+    "Connection": "keep-alive"
+}
+
+_SESSION = None
+_SESSION_LOCK = threading.Lock()
+_STATS_LOCK = threading.Lock()
+_HOST_STATS = {}
+_SOCKETS = weakref.WeakSet()
+
+
+class PooledAdapter(HTTPAdapter):
+    # Records on each response whether a pooled keep-alive connection was
+    # reused: a socket that already served a request is a reuse. Judged per
+    # response, so concurrent requests on the pool can't skew it.
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+
+        reused = _seen_before(response.raw.connection)
+        response.connection_reused = reused
+        _record(urlparse(request.url).netloc, reused)
+        return response
+
+
+class ScrapeSession(requests.Session):
+    # The session is shared by every scrape in the process, so cookies must
+    # never carry from one call to the next (they would follow one user's
+    # requests into another's). Each thread gets its own jar, emptied at the
+    # start of every call: a cookie set on a redirect is still sent along
+    # the rest of that request's redirect chain.
+
+    def __init__(self):
+        self._jars = threading.local()
+        super().__init__()
+
+    @property
+    def cookies(self):
+        jar = getattr(self._jars, "jar", None)
+        if jar is None:
+            jar = self._jars.jar = RequestsCookieJar()
+        return jar
+
+    @cookies.setter
+    def cookies(self, jar):
+        self._jars.jar = jar
+
+
+def _seen_before(connection) -> bool:
+    # urllib3 reconnects a dropped connection object in place, so the socket
+    # is what identifies one TCP connection. A connection already released
+    # back to the pool (empty body) can't be inspected and counts as new.
+    sock = getattr(connection, "sock", None)
+    if sock is None:
+        return False
+    with _STATS_LOCK:
+        if sock in _SOCKETS:
+            return True
+        _SOCKETS.add(sock)
+        return False
+
+
+def _record(host: str, reused: bool):
+    with _STATS_LOCK:
+        stats = _HOST_STATS.setdefault(host, {"requests": 0, "reused": 0})
+        stats["requests"] += 1
+        if reused:
+            stats["reused"] += 1
+
+
+def _build_session() -> requests.Session:
+    config = load_config()
+    adapter = PooledAdapter(
+        pool_connections=config.get("http_pool_hosts", 20),
+        pool_maxsize=config.get("http_max_per_host", 6),
+        # Past the per-host limit urllib3 opens a throwaway connection instead
+        # of waiting, so a leaked streamed response can't stall a host for good.
+        pool_block=False
+    )
+
+    session = ScrapeSession()
+    session.headers.update(DEFAULT_HEADERS)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    global _SESSION
+    if _SESSION is None:
+        with _SESSION_LOCK:
+            if _SESSION is None:
+                _SESSION = _build_session()
+    return _SESSION
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    session = get_session()
+    session.cookies.clear()
+    return session.get(url, **kwargs)
+
+
+def connection_stats(host: str | None = None) -> dict:
+    with _STATS_LOCK:
+        if host is not None:
+            return dict(_HOST_STATS.get(host, {"requests": 0, "reused": 0}))
+        return {h: dict(s) for h, s in _HOST_STATS.items()}
+
+
+def close():
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is not None:
+            _SESSION.close()
+            _SESSION = None
@@ -1,15 +1,329 @@
-from playwright.sync_api import sync_playwright
+import atexit
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from urllib.parse import urlparse
+from playwright.sync_api import sync_playwright, Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError
+from services import http_cache
+from services.data_manager import load_config
+from core.timing import timed
 
+_POOL = None
+_POOL_LOCK = threading.Lock()
 
-def fetch_dynamic(url: str) -> str:
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
+TRACKER_DOMAINS = [
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net",
+    "googlesyndication.com", "facebook.net", "connect.facebook.com",
+    "hotjar.com", "segment.io", "segment.com", "mixpanel.com",
+    "newrelic.com", "nr-data.net", "scorecardresearch.com", "quantserve.com",
+    "criteo.com", "taboola.com", "outbrain.com", "amazon-adsystem.com",
+    "adnxs.com", "clarity.ms", "fullstory.com", "optimizely.com"
+]
 
-        page.goto(url, timeout=30000)
-        page.wait_for_load_state("networkidle")
+# Used only to estimate savings: an aborted request never reports its size.
+TYPICAL_BYTES = {
+    "image": 40_000,
+    "media": 500_000,
+    "font": 30_000,
+    "stylesheet": 20_000,
+    "script": 30_000,
+    "xhr": 5_000,
+    "fetch": 5_000,
+    "other": 5_000
+}
 
-        html = page.content()
-        browser.close()
+RENDER_PROFILES = {
+    # Today's behaviour: load everything and wait for the network to go quiet.
+    "full": {
+        "block_types": [],
+        "block_trackers": False,
+        "wait_until": "networkidle",
+        "selector": None,
+        "quiet_ms": 0,
+        "max_settle_ms": 0
+    },
+    # DOM only: drop heavy/irrelevant resources, ready once mutations settle.
+    "fast": {
+        "block_types": ["image", "media", "font", "stylesheet"],
+        "block_trackers": True,
+        "wait_until": "domcontentloaded",
+        "selector": None,
+        "quiet_ms": 500,
+        "max_settle_ms": 5000
+    }
+}
 
-        return html
+# Resolves once the DOM has been mutation-free for `quiet` ms, or after `max` ms.
+SETTLE_JS = """
+([quiet, max]) => new Promise(resolve => {
+    const start = Date.now();
+    let timer;
+    const done = () => { observer.disconnect(); resolve(Date.now() - start); };
+    const observer = new MutationObserver(() => {
+        clearTimeout(timer);
+        timer = setTimeout(done, quiet);
+    });
+    observer.observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+    timer = setTimeout(done, quiet);
+    setTimeout(done, max);
+})
+"""
+
+
+def get_profile(name: str | None = None) -> dict:
+    config = load_config()
+    profiles = {**RENDER_PROFILES, **config.get("render_profiles", {})}
+    name = name or config.get("render_profile", "full")
+    if name not in profiles:
+        raise ValueError(f"Unknown render profile: {name}")
+    return {"name": name, **RENDER_PROFILES["full"], **profiles[name]}
+
+
+def is_tracker(url: str) -> bool:
+    host = urlparse(url).hostname or ""
+    return any(host == d or host.endswith("." + d) for d in TRACKER_DOMAINS)
+
+
+class BrowserWorker(threading.Thread):
+    # Playwright's sync API is bound to the thread that started it, so every
+    # browser lives on its own thread and is only ever driven from there.
+
+    def __init__(self, tasks: queue.Queue, recycle_after: int, prewarm: bool):
+        super().__init__(daemon=True, name="browser-worker")
+        self.tasks = tasks
+        self.recycle_after = recycle_after
+        self.prewarm = prewarm
+        self.playwright = None
+        self.browser = None
+        self.context = None
+        self.page = None
+        self.pages_served = 0
+        self.launches = 0
+        self.profile = RENDER_PROFILES["full"]
+        self.render_stats = {}
+
+    def run(self):
+        try:
+            with sync_playwright() as p:
+                self.playwright = p
+                if self.prewarm:
+                    try:
+                        self._launch()
+                    except PlaywrightError:
+                        self._teardown()  # retried lazily on the first task
+                self._serve()
+                self._teardown()
+        except Exception as e:
+            # Playwright itself failed to start; fail queued work instead of hanging it.
+            self._serve(error=e)
+
+    def _serve(self, error: Exception | None = None):
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                break
+
+            url, profile, future = task
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            if error is not None:
+                future.set_exception(error)
+                continue
+
+            try:
+                future.set_result(self._render_with_recovery(url, profile))
+            except Exception as e:
+                future.set_exception(e)
+
+    def _launch(self):
+        self.browser = self.playwright.chromium.launch(headless=True)
+        self.context = self.browser.new_context()
+        self.context.route("**/*", self._route)
+        self.context.on("response", self._on_response)
+        self.page = self.context.new_page()
+        self.pages_served = 0
+        self.launches += 1
+
+    def _teardown(self):
+        for closeable in (self.context, self.browser):
+            if closeable is None:
+                continue
+            try:
+                closeable.close()
+            except Exception:
+                pass
+        self.browser = None
+        self.context = None
+        self.page = None
+
+    def _ensure_ready(self):
+        if self.pages_served >= self.recycle_after:
+            self._teardown()
+        if self.browser is None or not self.browser.is_connected():
+            self._teardown()
+            self._launch()
+        elif self.page is None or self.page.is_closed():
+            self.page = self.context.new_page()
+
+    def _route(self, route):
+        request = route.request
+        profile = self.profile
+        stats = self.render_stats
+        stats["requests"] = stats.get("requests", 0) + 1
+
+        rtype = request.resource_type
+        if rtype in profile["block_types"] or (profile["block_trackers"] and is_tracker(request.url)):
+            stats["requests_blocked"] = stats.get("requests_blocked", 0) + 1
+            stats["bytes_saved_est"] = stats.get("bytes_saved_est", 0) + TYPICAL_BYTES.get(rtype, TYPICAL_BYTES["other"])
+            route.abort()
+        else:
+            route.continue_()
+
+    def _on_response(self, response):
+        # An estimate: only Content-Length is counted, so chunked responses
+        # add nothing and are tallied in responses_unsized instead.
+        try:
+            size = int(response.headers["content-length"])
+        except (KeyError, ValueError):
+            self.render_stats["responses_unsized"] = self.render_stats.get("responses_unsized", 0) + 1
+            return
+        self.render_stats["bytes_loaded_est"] = self.render_stats.get("bytes_loaded_est", 0) + size
+
+    def _render_with_recovery(self, url: str, profile: dict) -> tuple:
+        try:
+            self._ensure_ready()
+            return self._render(url, profile)
+        except PlaywrightError:
+            if (
+                self.browser is not None and self.browser.is_connected()
+                and self.page is not None and not self.page.is_closed()
+            ):
+                raise  # navigation/timeout errors are the page's fault, not the browser's
+            # Crashed browser or page: start clean and retry once.
+            self._teardown()
+            self._launch()
+            return self._render(url, profile)
+
+    def _render(self, url: str, profile: dict) -> tuple:
+        self.context.clear_cookies()
+        self.pages_served += 1
+        self.profile = profile
+        self.render_stats = stats = {
+            "profile": profile["name"],
+            "requests": 0,
+            "requests_blocked": 0,
+            "bytes_loaded_est": 0,
+            "responses_unsized": 0,
+            "bytes_saved_est": 0
+        }
+
+        start = time.time()
+        self.page.goto(url, timeout=30000, wait_until=profile["wait_until"])
+
+        if profile["selector"]:
+            try:
+                self.page.wait_for_selector(profile["selector"], timeout=profile["max_settle_ms"] or 30000)
+                stats["ready"] = "selector"
+            except PlaywrightTimeoutError:
+                stats["ready"] = "selector_timeout"
+        elif profile["quiet_ms"]:
+            settled = self.page.evaluate(SETTLE_JS, [profile["quiet_ms"], profile["max_settle_ms"]])
+            stats["ready"] = "max_settle" if settled >= profile["max_settle_ms"] else "dom_quiet"
+        else:
+            stats["ready"] = profile["wait_until"]
+
+        stats["render_ms"] = round((time.time() - start) * 1000)
+        return self.page.content(), dict(stats)
+
+
+class BrowserPool:
+    def __init__(self, size: int, recycle_after: int, prewarm: bool = True):
+        self.tasks = queue.Queue(maxsize=size * 4)
+        self.workers = [
+            BrowserWorker(self.tasks, recycle_after, prewarm)
+            for _ in range(size)
+        ]
+        for worker in self.workers:
+            worker.start()
+
+    def submit(self, url: str, profile: dict, timeout: float) -> Future:
+        future = Future()
+        self.tasks.put((url, profile, future), timeout=timeout)
+        return future
+
+    def shutdown(self, timeout: float = 10):
+        for _ in self.workers:
+            try:
+                self.tasks.put(None, timeout=timeout)
+            except queue.Full:
+                break
+        for worker in self.workers:
+            worker.join(timeout)
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self.workers),
+            "alive": sum(1 for w in self.workers if w.is_alive()),
+            "pages_served": sum(w.pages_served for w in self.workers),
+            "launches": sum(w.launches for w in self.workers),
+            "queued": self.tasks.qsize()
+        }
+
+
+def start_pool() -> BrowserPool:
+    global _POOL
+    if _POOL is None:
+        with _POOL_LOCK:
+            if _POOL is None:
+                config = load_config()
+                _POOL = BrowserPool(
+                    size=config.get("browser_pool_size", 1),
+                    recycle_after=config.get("browser_recycle_after", 50),
+                    prewarm=config.get("browser_prewarm", True)
+                )
+    return _POOL
+
+
+def shutdown_pool():
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.shutdown()
+            _POOL = None
+
+
+atexit.register(shutdown_pool)
+
+
+@timed("fetch_dynamic")
+def fetch_dynamic(
+    url: str,
+    info: dict | None = None,
+    profile: str | None = None,
+    cache: str = "use"
+) -> str:
+    info = {} if info is None else info
+    config = load_config()
+    profile = get_profile(profile)
+    # A render depends on what the profile blocked, so each profile has its own entry.
+    cache_engine = f"dynamic:{profile['name']}"
+
+    # Rendered HTML carries no validators, so it is only ever served while fresh.
+    entry = http_cache.lookup(url, cache_engine) if cache == "use" else None
+    if entry and entry["fresh"]:
+        info["cache"] = "hit"
+        return entry["text"]
+
+    timeout = config.get("timeout", 30)
+    # Allow for the navigation timeout plus time spent waiting in the queue.
+    future = start_pool().submit(url, profile, timeout=timeout)
+    html, stats = future.result(timeout=timeout + 60)
+    info["render"] = stats
+    info["bytes"] = stats.get("bytes_loaded_est") or len(html)
+
+    if cache != "bypass":
+        http_cache.store(url, cache_engine, html, ttl=config.get("render_cache_ttl", 900))
+    info["cache"] = "miss" if cache == "use" else cache
+    return html
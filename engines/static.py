@@ -1,17 +1,123 @@
-import requests
+import codecs
+import re
+from requests.compat import chardet
+from engines import client
+from services import http_cache
 from services.data_manager import load_config
+from core.timing import timed
 
-def fetch_static(url: str) -> str:
+HTML_TYPES = ["text/html", "application/xhtml+xml"]
+CHUNK_SIZE = 65536
+SNIFF_BYTES = 4096
+
+BOMS = [
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16")
+]
+HEADER_CHARSET = re.compile(r"charset\s*=\s*[\"']?([\w.:-]+)", re.I)
+META_CHARSET = re.compile(rb"<meta[^>]+charset\s*=\s*[\"']?\s*([\w.:-]+)", re.I)
+
+
+class NotHTML(ValueError):
+    pass
+
+
+def known_encoding(name) -> str | None:
+    if isinstance(name, bytes):
+        name = name.decode("ascii", "ignore")
+    try:
+        name = codecs.lookup(name).name
+    except (LookupError, TypeError):
+        return None
+    # Browsers read a latin-1 label as its windows-1252 superset.
+    return "cp1252" if name == "iso8859-1" else name
+
+
+def sniff_encoding(content_type: str, body: bytes) -> tuple:
+    # Cheapest reliable answer first: BOM, then the header charset, then a
+    # <meta charset> near the top, then "it decodes as UTF-8". Statistical
+    # detection over the whole body is the last resort.
+    for bom, encoding in BOMS:
+        if body.startswith(bom):
+            return encoding, "bom"
+
+    match = HEADER_CHARSET.search(content_type)
+    if match and known_encoding(match.group(1)):
+        return known_encoding(match.group(1)), "header"
+
+    match = META_CHARSET.search(body[:SNIFF_BYTES])
+    if match and known_encoding(match.group(1)):
+        return known_encoding(match.group(1)), "meta"
+
+    try:
+        # final=False: a body cut at max_bytes may end mid-character.
+        codecs.getincrementaldecoder("utf-8")().decode(body, final=False)
+        return "utf-8", "utf-8"
+    except UnicodeDecodeError:
+        pass
+
+    return known_encoding(chardet.detect(body)["encoding"]) or "cp1252", "detected"
+
+
+def read_body(r, max_bytes: int, info: dict) -> bytes:
+    # Stops at max_bytes; the parser copes with a truncated document and a
+    # runaway page can't hold a worker's memory hostage.
+    body = bytearray()
+    for chunk in r.iter_content(CHUNK_SIZE):
+        body.extend(chunk)
+        if len(body) >= max_bytes:
+            del body[max_bytes:]
+            info["truncated"] = True
+            break
+    info["bytes"] = len(body)
+    return bytes(body)
+
+
+@timed("fetch_static")
+def fetch_static(url: str, info: dict | None = None, cache: str = "use") -> str:
+    info = {} if info is None else info
     config = load_config()
     headers = {
         "User-Agent": config.get("user_agent")
     }
-    
-    r = requests.get(url, headers=headers, timeout=config.get("timeout", 10))
-    r.raise_for_status()
-    
-    # Ensure we use the correct encoding
-    if r.encoding is None or r.encoding == 'ISO-8859-1':
-        r.encoding = r.apparent_encoding
-        
-    return r.text
+
+    entry = http_cache.lookup(url, "static") if cache == "use" else None
+    if entry and entry["fresh"]:
+        info["cache"] = "hit"
+        return entry["text"]
+    headers.update(http_cache.conditional_headers(entry))
+
+    r = client.get(url, headers=headers, timeout=config.get("timeout", 10), stream=True)
+    try:
+        info["connection_reused"] = getattr(r, "connection_reused", False)
+        info["bytes"] = 0
+
+        if r.status_code == 304 and entry:
+            http_cache.revalidated(entry, r.headers)
+            info["cache"] = "revalidated"
+            return entry["text"]
+
+        r.raise_for_status()
+
+        # Bail out before reading a PDF, image or archive that was linked like a page.
+        content_type = r.headers.get("Content-Type", "")
+        mime = content_type.split(";")[0].strip().lower()
+        if mime and mime not in HTML_TYPES:
+            raise NotHTML(f"Not an HTML page ({mime})")
+
+        body = read_body(r, config.get("static_max_bytes", 10 * 1024 * 1024), info)
+    finally:
+        r.close()
+
+    encoding, source = sniff_encoding(content_type, body)
+    info["encoding"] = encoding
+    info["encoding_source"] = source
+    text = body.decode(encoding, errors="replace")
+
+    # A truncated body is good enough to extract from but not to cache.
+    if cache != "bypass" and not info.get("truncated"):
+        http_cache.store(url, "static", text, r.headers)
+    info["cache"] = "miss" if cache == "use" else cache
+
+    return text
@@ -0,0 +1,23 @@
+# Picked up automatically by `gunicorn app:app` from the working directory.
+
+
+def post_fork(server, worker):
+    from app import scrape
+    from services.data_manager import load_config
+    from services import extract_pool, jobs
+
+    # Each worker process runs its own background job threads.
+    jobs.start_workers(scrape)
+    # Warm extraction workers (if configured) before the first request.
+    extract_pool.start()
+    if load_config().get("browser_prewarm", True):
+        from engines.dynamic import start_pool
+        start_pool()
+
+
+def worker_exit(server, worker):
+    from engines.dynamic import shutdown_pool
+    from services import extract_pool, metrics
+    shutdown_pool()
+    extract_pool.shutdown()
+    metrics.flush()
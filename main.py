@@ -1,20 +1,11 @@
-from core.detector import needs_js
-from core.cleaner import clean_html
-from core.extractor import extract_main_content
-from core.structures import extract_tables
+from core.document import ParsedPage
+from core.structures import TablesExtractor
 from core.paginator import find_next_page
 from core.ethics import check_robots, rate_limit, is_sensitive
-from core.exporter import export_json, export_txt, export_markdown, export_tables_csv
-from engines.static import fetch_static
-from engines.dynamic import fetch_dynamic
-from core.products import extract_books
-
-
-def fetch(url):
-    html = fetch_static(url)
-    if needs_js(html):
-        html = fetch_dynamic(url)
-    return html
+from core.exporter import export_json, export_txt, export_markdown, run_dir, TableArchive
+from core.schemas import SchemaExtractor
+from services.scraper_service import fetch_page
+from services.schema_registry import match as match_schema
 
 
 def main():
@@ -26,47 +17,48 @@ def main():
         return
 
     delay = check_robots(start_url)
-    is_books_site = "books.toscrape.com" in start_url
+    schema = match_schema(start_url)
 
     content_blocks = []
-    tables = []
     page = 0
     url = start_url
+    out = run_dir()
 
-    while url and page < max_pages:
-        page += 1
-        print(f"Scraping page {page}: {url}")
+    # Tables go straight into the archive as each page is parsed.
+    with TableArchive(out / "tables.zip") as archive:
+        while url and page < max_pages:
+            page += 1
+            print(f"Scraping page {page}: {url}")
 
-        rate_limit(url, delay)
-        html = fetch(url)
-        soup = clean_html(html)
+            rate_limit(url, delay)
+            html = fetch_page(url)
+            doc = ParsedPage(html, url)
 
-        if is_books_site:
-            books = extract_books(soup)
-            content_blocks.extend(
-                [f"{b['title']} | {b['price']} | {b['rating']}" for b in books]
-            )
-        else:
-            content_blocks.append(extract_main_content(html))
-            tables.extend(extract_tables(soup))
+            if schema:
+                items = SchemaExtractor(schema, url).run(doc.cleaned)
+                content_blocks.extend(
+                    [f"{item.get('title')} | {item.get('price')} | {item.get('rating')}" for item in items]
+                )
+            else:
+                content_blocks.append(doc.main_content)
+                TablesExtractor(sink=archive.sink(url)).run(doc.cleaned)
 
-        next_url = find_next_page(soup, url)
-        if not next_url:
-            break
+            next_url = find_next_page(doc.cleaned, url)
+            if not next_url:
+                break
 
-        url = next_url
+            url = next_url
 
     final_content = "\n\n".join(content_blocks)
 
-    export_txt(final_content)
-    export_markdown("Scraped Content", final_content)
-    export_tables_csv(tables)
+    export_txt(final_content, out / "output.txt")
+    export_markdown("Scraped Content", final_content, out / "output.md")
     export_json({
         "pages": page,
         "items": len(content_blocks)
-    })
+    }, out / "output.json")
 
-    print("✅ Done. Data exported.")
+    print(f"✅ Done. Data exported to {out}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,201 @@
+import queue
+import threading
+import time
+from collections import deque
+from core.ethics import check_robots, is_sensitive
+from core.urls import url_host
+from services.scraper_service import iter_scrape, new_stats, count_page, run_meta
+from services import domain_store
+from services.data_manager import load_config, log_scrape
+
+ORDERS = ["completion", "input"]
+
+
+class BatchCancelled(Exception):
+    pass
+
+
+class SlotUnavailable(Exception):
+    # The slot store failed while a domain's next URL was being handed out.
+    # That URL is already off the queue, so the worker must report it.
+
+    def __init__(self, domain: str, job: tuple, cause: Exception):
+        super().__init__(str(cause))
+        self.domain = domain
+        self.job = job
+
+
+class DomainScheduler:
+    # Round-robin over domains. A domain is held by at most one worker at a
+    # time, so its crawl delay still holds, and after each URL it goes to the
+    # back of the line so one large domain can't starve the others.
+
+    def __init__(self, items: list, robots: dict):
+        self.cond = threading.Condition()
+        self.queues = {}
+        for index, item in enumerate(items):
+            self.queues.setdefault(url_host(item["url"]), deque()).append((index, item))
+        self.ready = deque(self.queues)
+        self.robots = robots
+
+    def delay(self, domain: str):
+        # The crawl delay for the domain's next URL, once a worker has looked
+        # up its robots.txt; None until then, or if that URL is disallowed.
+        if domain not in self.robots:
+            return None
+        _, item = self.queues[domain][0]
+        try:
+            return check_robots(item["url"], robots=self.robots)
+        except PermissionError:
+            return None
+
+    def take(self, stop: threading.Event) -> tuple | None:
+        # Hands out the next URL of a domain whose request slot is free right
+        # now, booking that slot so the first fetch doesn't sleep in
+        # rate_limit. While every ready domain is inside its crawl delay the
+        # worker waits here, and picks up whichever domain frees up (or is
+        # released by another worker) first.
+        with self.cond:
+            while not stop.is_set():
+                if not self.ready:
+                    return None
+
+                soonest = None
+                for domain in sorted(self.ready, key=self._slot_wait):
+                    try:
+                        delay = self.delay(domain)
+                        wait = domain_store.try_reserve_slot(domain, delay) if delay is not None else 0.0
+                    except Exception as e:
+                        self.ready.remove(domain)
+                        raise SlotUnavailable(domain, self.queues[domain].popleft(), e)
+                    if not wait:
+                        self.ready.remove(domain)
+                        return domain, self.queues[domain].popleft(), delay is not None
+                    soonest = wait if soonest is None else min(soonest, wait)
+                self.cond.wait(soonest)
+            return None
+
+    @staticmethod
+    def _slot_wait(domain: str) -> float:
+        # Only orders the candidates; a store error surfaces on reservation.
+        try:
+            return domain_store.slot_wait(domain)
+        except Exception:
+            return 0.0
+
+    def release(self, domain: str):
+        with self.cond:
+            if self.queues[domain]:
+                self.ready.append(domain)
+                self.cond.notify()
+
+
+def _run_one(index: int, item: dict, robots: dict, emit, stop: threading.Event, reserved: bool = False):
+    url = item["url"]
+    start_time = time.time()
+    stats = new_stats()
+    pages = []
+
+    def progress(pages_done, current_url):
+        if stop.is_set():
+            raise BatchCancelled()
+
+    if is_sensitive(url):
+        log_scrape(url, "blocked", 0, 0)
+        emit({"type": "error", "index": index, "url": url, "error": "Sensitive pages are blocked"})
+        return
+
+    try:
+        for record in iter_scrape(**item, progress=progress, robots=robots, reserved=reserved):
+            count_page(stats, record)
+            pages.append(record["meta"])
+            emit({"type": "page", "index": index, **record})
+
+        emit({"type": "result", "index": index, "url": url, "stats": stats, "meta": run_meta(pages)})
+        item_count = stats["articles"] + stats["products"] + stats["tables"] + stats["images"]
+        log_scrape(url, "success", stats["pages"], time.time() - start_time, item_count)
+    except BatchCancelled:
+        log_scrape(url, "cancelled", stats["pages"], time.time() - start_time)
+    except Exception as e:
+        emit({"type": "error", "index": index, "url": url, "error": str(e)})
+        log_scrape(url, "error", stats["pages"], time.time() - start_time)
+
+
+def iter_batch(items: list, order: str = "completion"):
+    # Yields page, result and error records for every item, then a summary.
+    # "completion" passes records on as workers produce them; "input" holds
+    # them back so each URL's records arrive whole and in request order,
+    # while the URL at the head of the line still streams live.
+    if order not in ORDERS:
+        raise ValueError(f"Unknown order: {order}")
+
+    started = time.time()
+    robots = {}
+    scheduler = DomainScheduler(items, robots)
+    workers = min(len(scheduler.queues), load_config().get("batch_workers", 8))
+    records = queue.Queue()
+    stop = threading.Event()
+
+    def work():
+        try:
+            while not stop.is_set():
+                try:
+                    job = scheduler.take(stop)
+                except SlotUnavailable as e:
+                    # Fail this URL, not the worker: the domain's other URLs
+                    # go back in line and each still gets a record.
+                    index, item = e.job
+                    records.put({"type": "error", "index": index, "url": item["url"], "error": str(e)})
+                    scheduler.release(e.domain)
+                    continue
+                if job is None:
+                    break
+                domain, (index, item), reserved = job
+                _run_one(index, item, robots, records.put, stop, reserved)
+                scheduler.release(domain)
+        finally:
+            records.put(None)
+
+    for i in range(workers):
+        threading.Thread(target=work, daemon=True, name=f"batch-worker-{i}").start()
+
+    finished = 0
+    buffered = {}
+    done = set()
+    next_index = 0
+    counts = {"succeeded": 0, "failed": 0}
+
+    try:
+        while finished < workers:
+            record = records.get()
+            if record is None:
+                finished += 1
+                continue
+
+            if record["type"] == "result":
+                counts["succeeded"] += 1
+            elif record["type"] == "error":
+                counts["failed"] += 1
+
+            if order == "completion":
+                yield record
+                continue
+
+            buffered.setdefault(record["index"], []).append(record)
+            if record["type"] != "page":
+                done.add(record["index"])
+            while True:
+                yield from buffered.pop(next_index, [])
+                if next_index not in done:
+                    break
+                next_index += 1
+
+        yield {
+            "type": "summary",
+            "urls": len(items),
+            "domains": len(scheduler.queues),
+            **counts,
+            "elapsed": round(time.time() - started, 2)
+        }
+    finally:
+        stop.set()
@@ -1,11 +1,15 @@
 import json
 import os
+import sqlite3
+import threading
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
 
 # Check for persistent storage path (Render disk)
 DATA_DIR = "/data" if os.path.exists("/data") else "."
 STATS_FILE = os.path.join(DATA_DIR, "stats.json")
+STATS_DB = os.path.join(DATA_DIR, "stats.db")
 CONFIG_FILE = os.path.join(DATA_DIR, "config.json")
 
 DEFAULT_CONFIG = {
@@ -14,9 +18,80 @@ DEFAULT_CONFIG = {
     "proxy_enabled": False,
     "api_key": "wx_live_free_key_12345",
     "max_pages_limit": 10,
-    "timeout": 30
+    "pipeline_pagination": True,
+    "domain_concurrency": 2,
+    "batch_workers": 8,
+    "batch_max_urls": 100,
+    "robots_ttl": 86400,
+    "robots_negative_ttl": 900,
+    "image_download_workers": 6,
+    "image_max_bytes": 10485760,
+    "image_archive_max_bytes": 209715200,
+    "static_max_bytes": 10485760,
+    "extract_processes": 0,
+    "extract_queue_size": 32,
+    "extract_timeout": 60,
+    "extract_max_rss_mb": 512,
+    "extract_max_tasks": 1000,
+    "export_compression": "gzip",
+    "export_table_format": "csv",
+    "crawl_seen_initial": 10000,
+    "crawl_save_every": 10,
+    "metrics_flush_interval": 5,
+    "metrics_extractor_timing": False,
+    "timeout": 30,
+    "http_pool_hosts": 20,
+    "http_max_per_host": 6,
+    "browser_pool_size": 1,
+    "browser_recycle_after": 50,
+    "browser_prewarm": True,
+    "render_profile": "full",
+    "engine_cache_ttl": 86400,
+    "http_cache_ttl": 0,
+    "render_cache_ttl": 900,
+    "http_cache_max_bytes": 268435456,
+    "stats_retention_days": 90,
+    "job_workers": 2,
+    "job_poll_interval": 0.5,
+    "job_stale_after": 600,
+    "job_retention_hours": 24,
+    "fingerprint_max_age_days": 30,
+    "fingerprint_max_entries": 50000
 }
 
+_local = threading.local()
+
+STATS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scrapes (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    day TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    url TEXT NOT NULL,
+    status TEXT NOT NULL,
+    pages INTEGER NOT NULL,
+    duration REAL NOT NULL,
+    items INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scrapes_day ON scrapes (day);
+CREATE TABLE IF NOT EXISTS daily_rollup (
+    day TEXT PRIMARY KEY,
+    requests INTEGER NOT NULL,
+    successes INTEGER NOT NULL,
+    duration REAL NOT NULL,
+    items INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS domain_rollup (
+    domain TEXT NOT NULL,
+    day TEXT NOT NULL,
+    requests INTEGER NOT NULL,
+    successes INTEGER NOT NULL,
+    duration REAL NOT NULL,
+    items INTEGER NOT NULL,
+    PRIMARY KEY (domain, day)
+);
+"""
+
 def load_config():
     if not os.path.exists(CONFIG_FILE):
         save_config(DEFAULT_CONFIG)
@@ -31,6 +106,70 @@ def save_config(config):
     with open(CONFIG_FILE, "w") as f:
         json.dump(config, f, indent=4)
 
+def _stats_db():
+    conn = getattr(_local, "stats", None)
+    if conn is None:
+        conn = sqlite3.connect(STATS_DB, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(STATS_SCHEMA)
+        _local.stats = conn
+        _import_legacy_stats(conn)
+    return conn
+
+def _import_legacy_stats(conn):
+    # One-time move of the old stats.json history into the store.
+    # Renaming first means only one worker wins the import.
+    imported = STATS_FILE + ".imported"
+    try:
+        os.replace(STATS_FILE, imported)
+    except OSError:
+        return
+    try:
+        with open(imported, "r") as f:
+            legacy = json.load(f)
+    except:
+        legacy = []
+    with conn:
+        for entry in legacy:
+            _insert_scrape(conn, entry)
+
+def _insert_scrape(conn, entry):
+    day = entry["timestamp"].split("T")[0]
+    domain = urlparse(entry["url"]).netloc
+    success = 1 if entry["status"] == "success" else 0
+    row = (1, success, entry["duration"], entry["items"])
+
+    conn.execute(
+        "INSERT INTO scrapes (timestamp, day, domain, url, status, pages, duration, items) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (entry["timestamp"], day, domain, entry["url"], entry["status"],
+         entry["pages"], entry["duration"], entry["items"])
+    )
+    conn.execute(
+        "INSERT INTO daily_rollup VALUES (?, ?, ?, ?, ?) ON CONFLICT (day) DO UPDATE SET "
+        "requests = requests + excluded.requests, successes = successes + excluded.successes, "
+        "duration = duration + excluded.duration, items = items + excluded.items",
+        (day, *row)
+    )
+    conn.execute(
+        "INSERT INTO domain_rollup VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (domain, day) DO UPDATE SET "
+        "requests = requests + excluded.requests, successes = successes + excluded.successes, "
+        "duration = duration + excluded.duration, items = items + excluded.items",
+        (domain, day, *row)
+    )
+
+def _retention_cutoff():
+    days = load_config().get("stats_retention_days", 90)
+    return (datetime.now() - timedelta(days=days)).date().isoformat()
+
+def prune_stats():
+    cutoff = _retention_cutoff()
+    conn = _stats_db()
+    with conn:
+        conn.execute("DELETE FROM scrapes WHERE day < ?", (cutoff,))
+        conn.execute("DELETE FROM daily_rollup WHERE day < ?", (cutoff,))
+        conn.execute("DELETE FROM domain_rollup WHERE day < ?", (cutoff,))
+
 def log_scrape(url, status, pages, duration, items=0):
     log_entry = {
         "timestamp": datetime.now().isoformat(),
@@ -40,56 +179,51 @@ def log_scrape(url, status, pages, duration, items=0):
         "duration": round(duration, 2),
         "items": items
     }
-    
-    stats = []
-    if os.path.exists(STATS_FILE):
-        try:
-            with open(STATS_FILE, "r") as f:
-                stats = json.load(f)
-        except:
-            stats = []
-            
-    stats.append(log_entry)
-    
-    # Keep only last 1000 entries
-    if len(stats) > 1000:
-        stats = stats[-1000:]
-        
-    with open(STATS_FILE, "w") as f:
-        json.dump(stats, f)
+
+    conn = _stats_db()
+    with conn:
+        _insert_scrape(conn, log_entry)
+
+    # Rollups are per day, so retention only needs enforcing when a new day starts.
+    today = log_entry["timestamp"].split("T")[0]
+    if getattr(_local, "pruned_day", None) != today:
+        prune_stats()
+        _local.pruned_day = today
 
 def get_analytics():
-    if not os.path.exists(STATS_FILE):
-        return None
-        
-    try:
-        with open(STATS_FILE, "r") as f:
-            stats = json.load(f)
-    except:
-        return None
-        
-    if not stats:
+    conn = _stats_db()
+    cutoff = _retention_cutoff()
+
+    # Rollups hold one row per day (and per domain per day), so these queries
+    # are bounded by the retention window rather than by the number of scrapes.
+    total_requests, successes, total_duration, total_items = conn.execute(
+        "SELECT COALESCE(SUM(requests), 0), COALESCE(SUM(successes), 0), "
+        "COALESCE(SUM(duration), 0), COALESCE(SUM(items), 0) FROM daily_rollup WHERE day >= ?",
+        (cutoff,)
+    ).fetchone()
+
+    if not total_requests:
         return None
-        
-    total_requests = len(stats)
-    successes = [s for s in stats if s["status"] == "success"]
-    success_rate = (len(successes) / total_requests * 100) if total_requests > 0 else 0
-    avg_duration = sum(s["duration"] for s in stats) / total_requests if total_requests > 0 else 0
-    total_items = sum(s["items"] for s in stats)
-    
-    # Group by day for the chart
-    history = {}
-    for s in stats:
-        day = s["timestamp"].split("T")[0]
-        history[day] = history.get(day, 0) + 1
-        
-    # Format for UI
-    sorted_history = [{"date": k, "count": v} for k, v in sorted(history.items(), reverse=True)[:7]]
-    
+
+    success_rate = successes / total_requests * 100
+    avg_duration = total_duration / total_requests
+
+    history = conn.execute(
+        "SELECT day, requests FROM daily_rollup WHERE day >= ? ORDER BY day DESC LIMIT 7",
+        (cutoff,)
+    ).fetchall()
+
+    domains = conn.execute(
+        "SELECT domain, SUM(requests) AS n, SUM(successes) FROM domain_rollup WHERE day >= ? "
+        "GROUP BY domain ORDER BY n DESC LIMIT 5",
+        (cutoff,)
+    ).fetchall()
+
     return {
         "total_requests": total_requests,
         "success_rate": f"{round(success_rate, 1)}%",
         "avg_time": f"{round(avg_duration, 2)}s",
         "data_extracted": f"{total_items} items",
-        "history": sorted_history[::-1] # chronological for chart
+        "history": [{"date": d, "count": c} for d, c in history][::-1], # chronological for chart
+        "top_domains": [{"domain": d, "count": n, "successes": ok} for d, n, ok in domains]
     }
@@ -0,0 +1,101 @@
+import os
+import sqlite3
+import threading
+import time
+from services.data_manager import DATA_DIR, load_config
+
+# Per-domain politeness state shared by every worker process: the next free
+# request slot and the last robots.txt answer.
+DOMAINS_DB = os.path.join(DATA_DIR, "domains.db")
+
+_local = threading.local()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS slots (
+    domain TEXT PRIMARY KEY,
+    next_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS robots (
+    domain TEXT PRIMARY KEY,
+    body TEXT,
+    fallback_delay INTEGER,
+    fetched_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+def _db() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(DOMAINS_DB, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        _local.conn = conn
+    return conn
+
+
+def reserve_slot(domain: str, delay: float) -> float:
+    # Claims the domain's next free slot and returns when it starts (epoch
+    # seconds). Never sleeps: the caller waits, or schedules other work first.
+    conn = _db()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute("SELECT next_at FROM slots WHERE domain = ?", (domain,)).fetchone()
+        start = max(time.time(), row[0] if row else 0)
+        conn.execute("INSERT OR REPLACE INTO slots VALUES (?, ?)", (domain, start + delay))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return start
+
+
+def try_reserve_slot(domain: str, delay: float) -> float:
+    # Reserves only if the domain is free right now. Returns 0 on success,
+    # otherwise the seconds until it frees up, without reserving anything.
+    conn = _db()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        now = time.time()
+        row = conn.execute("SELECT next_at FROM slots WHERE domain = ?", (domain,)).fetchone()
+        wait = max(0.0, (row[0] if row else 0) - now)
+        if not wait:
+            conn.execute("INSERT OR REPLACE INTO slots VALUES (?, ?)", (domain, now + delay))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return wait
+
+
+def slot_wait(domain: str) -> float:
+    row = _db().execute("SELECT next_at FROM slots WHERE domain = ?", (domain,)).fetchone()
+    return max(0.0, (row[0] if row else 0) - time.time())
+
+
+def load_robots(domain: str) -> dict | None:
+    row = _db().execute(
+        "SELECT body, fallback_delay, fetched_at FROM robots WHERE domain = ? AND expires_at > ?",
+        (domain, time.time())
+    ).fetchone()
+    if row is None:
+        return None
+    return {"body": row[0], "fallback_delay": row[1], "fetched_at": row[2]}
+
+
+def save_robots(domain: str, body: str | None = None, fallback_delay: int | None = None) -> dict:
+    # A body is a parsed robots.txt; a fallback delay records a failure (403,
+    # 404, timeout) so it is not retried on every scrape. Failures expire sooner.
+    config = load_config()
+    if body is not None:
+        ttl = config.get("robots_ttl", 86400)
+    else:
+        ttl = config.get("robots_negative_ttl", 900)
+
+    now = time.time()
+    _db().execute(
+        "INSERT OR REPLACE INTO robots VALUES (?, ?, ?, ?, ?)",
+        (domain, body, fallback_delay, now, now + ttl)
+    )
+    return {"body": body, "fallback_delay": fallback_delay, "fetched_at": now}
@@ -0,0 +1,72 @@
+import json
+import os
+import threading
+import time
+from urllib.parse import urlparse
+from services.data_manager import DATA_DIR, load_config
+
+ENGINE_CACHE_FILE = os.path.join(DATA_DIR, "engines.json")
+ENGINES = ["static", "dynamic"]
+
+_LOCK = threading.Lock()
+_CACHE = {}
+_CACHE_MTIME = None
+
+
+def _load():
+    global _CACHE, _CACHE_MTIME
+    # Other gunicorn workers write the same file; pick up their decisions.
+    try:
+        mtime = os.path.getmtime(ENGINE_CACHE_FILE)
+    except OSError:
+        return
+    if mtime == _CACHE_MTIME:
+        return
+    try:
+        with open(ENGINE_CACHE_FILE, "r") as f:
+            _CACHE = json.load(f)
+        _CACHE_MTIME = mtime
+    except:
+        pass
+
+
+def _save():
+    global _CACHE_MTIME
+    tmp = f"{ENGINE_CACHE_FILE}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(_CACHE, f)
+    os.replace(tmp, ENGINE_CACHE_FILE)
+    _CACHE_MTIME = os.path.getmtime(ENGINE_CACHE_FILE)
+
+
+def get_engine(url: str) -> str | None:
+    domain = urlparse(url).netloc
+    ttl = load_config().get("engine_cache_ttl", 86400)
+
+    with _LOCK:
+        _load()
+        entry = _CACHE.get(domain)
+
+    if not entry or time.time() - entry["decided_at"] > ttl:
+        return None
+    return entry["engine"]
+
+
+def record_engine(url: str, engine: str, js_signals: bool, static_content: bool | None):
+    domain = urlparse(url).netloc
+
+    with _LOCK:
+        _load()
+        previous = _CACHE.get(domain, {})
+        _CACHE[domain] = {
+            "engine": engine,
+            "decided_at": time.time(),
+            "js_signals": js_signals,
+            "static_content": static_content,
+            "observations": previous.get("observations", 0) + 1
+        }
+        try:
+            _save()
+        except OSError:
+            pass  # the in-memory decision still applies for this worker
+
@@ -0,0 +1,178 @@
+import multiprocessing
+import queue
+import resource
+import threading
+import time
+from services.data_manager import load_config
+
+# Parsing and extraction are CPU-bound Python, so threads in one gunicorn
+# worker share a single core. With extract_processes > 0 pages are handed to
+# long-lived worker processes instead. Workers fork from a forkserver that
+# has already imported the extraction stack, so a new or recycled worker is
+# warm straight away.
+WARM_MODULES = ["services.scraper_service"]
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+class ExtractTimeout(TimeoutError):
+    pass
+
+
+def _serve(conn, max_rss_mb: int, max_tasks: int):
+    from services import metrics
+
+    tasks = 0
+    try:
+        while True:
+            try:
+                task = conn.recv()
+            except EOFError:
+                return
+            if task is None:
+                return
+
+            fn, args = task
+            tasks += 1
+            try:
+                reply = ("ok", fn(*args))
+            except Exception as e:
+                reply = ("error", e)
+
+            # ru_maxrss is the peak in KB: once it passes the limit, this
+            # process has grown for good and is replaced after the task.
+            rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024
+            recycle = rss_mb > max_rss_mb or tasks >= max_tasks
+            try:
+                conn.send((*reply, recycle))
+            except Exception as e:
+                # the result or the exception didn't pickle
+                conn.send(("error", RuntimeError(f"{type(e).__name__}: {e}"), recycle))
+            if recycle:
+                return
+    finally:
+        metrics.flush()
+
+
+class Worker:
+
+    def __init__(self, ctx, max_rss_mb: int, max_tasks: int):
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_serve, args=(child, max_rss_mb, max_tasks), daemon=True, name="extract-worker"
+        )
+        self.process.start()
+        child.close()
+
+    def stop(self, kill: bool = False):
+        if kill:
+            self.process.kill()
+        else:
+            try:
+                self.conn.send(None)
+            except OSError:
+                pass
+        self.process.join(5)
+        self.conn.close()
+
+
+class ExtractPool:
+
+    def __init__(self, processes: int, queue_size: int, timeout: float, max_rss_mb: int, max_tasks: int):
+        self.ctx = multiprocessing.get_context("forkserver")
+        self.ctx.set_forkserver_preload(WARM_MODULES)
+        self.timeout = timeout
+        self.limits = (max_rss_mb, max_tasks)
+        # Running plus waiting tasks; past that, callers extract on their own thread.
+        self.slots = threading.BoundedSemaphore(processes + queue_size)
+        self.idle = queue.Queue()
+        self.workers = []
+        for _ in range(processes):
+            self.idle.put(self._spawn())
+
+    def _spawn(self) -> Worker:
+        worker = Worker(self.ctx, *self.limits)
+        self.workers.append(worker)
+        return worker
+
+    def _replace(self, worker: Worker, kill: bool = False) -> Worker:
+        worker.stop(kill)
+        self.workers.remove(worker)
+        return self._spawn()
+
+    def run(self, fn, args: tuple):
+        # extract_timeout covers the whole call: waiting for a free worker
+        # as well as the extraction itself.
+        deadline = time.monotonic() + self.timeout
+        try:
+            worker = self.idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise ExtractTimeout(f"No extraction worker was free within {self.timeout}s")
+        try:
+            try:
+                worker.conn.send((fn, args))
+                done = worker.conn.poll(max(0.0, deadline - time.monotonic()))
+                if done:
+                    status, value, recycle = worker.conn.recv()
+            except (EOFError, OSError):
+                worker = self._replace(worker, kill=True)
+                raise RuntimeError("Extraction worker died")
+
+            if not done:
+                worker = self._replace(worker, kill=True)
+                raise ExtractTimeout(f"Extraction took longer than {self.timeout}s")
+            if recycle:
+                worker = self._replace(worker)
+        finally:
+            # A worker that was stopped but couldn't be replaced (_spawn
+            # raised) is no longer in self.workers and must not be handed out.
+            if worker in self.workers:
+                self.idle.put(worker)
+
+        if status == "error":
+            raise value
+        return value
+
+    def close(self):
+        for worker in list(self.workers):
+            worker.stop()
+        self.workers.clear()
+
+
+def start():
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            config = load_config()
+            processes = config.get("extract_processes", 0)
+            if processes > 0:
+                _POOL = ExtractPool(
+                    processes,
+                    config.get("extract_queue_size", 32),
+                    config.get("extract_timeout", 60),
+                    config.get("extract_max_rss_mb", 512),
+                    config.get("extract_max_tasks", 1000)
+                )
+    return _POOL
+
+
+def call(fn, *args):
+    # Runs fn(*args) on a worker process and returns its result. Without a
+    # pool, or when the queue is full, it runs right here instead, which
+    # also throttles the caller.
+    pool = _POOL or start()
+    if pool is None or not pool.slots.acquire(blocking=False):
+        return fn(*args)
+    try:
+        return pool.run(fn, args)
+    finally:
+        pool.slots.release()
+
+
+def shutdown():
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.close()
+            _POOL = None
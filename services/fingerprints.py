@@ -0,0 +1,74 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from core.urls import canonicalize_url
+from services.data_manager import DATA_DIR, load_config
+
+# Last fingerprint and extracted record per (URL, what was extracted), shared
+# by every worker process. A page whose fingerprint matches skips extraction.
+# Records older than fingerprint_max_age_days, and the oldest beyond
+# fingerprint_max_entries, are pruned every PRUNE_EVERY saves.
+FINGERPRINTS_DB = os.path.join(DATA_DIR, "fingerprints.db")
+PRUNE_EVERY = 200
+
+_local = threading.local()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT NOT NULL,
+    needs TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    record TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (url, needs)
+);
+CREATE INDEX IF NOT EXISTS pages_age ON pages (updated_at);
+"""
+
+
+def _db() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(FINGERPRINTS_DB, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        _local.conn = conn
+        _local.saves = 0
+    return conn
+
+
+def _key(url: str, needs: set) -> tuple:
+    return canonicalize_url(url), ",".join(sorted(needs))
+
+
+def load(url: str, needs: set) -> dict | None:
+    row = _db().execute(
+        "SELECT digest, record, updated_at FROM pages WHERE url = ? AND needs = ?", _key(url, needs)
+    ).fetchone()
+    if row is None:
+        return None
+    return {"digest": row[0], "record": json.loads(row[1]), "updated_at": row[2]}
+
+
+def save(url: str, needs: set, digest: str, record: dict):
+    conn = _db()
+    conn.execute(
+        "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)",
+        (*_key(url, needs), digest, json.dumps(record), time.time())
+    )
+    if _local.saves % PRUNE_EVERY == 0:
+        prune()
+    _local.saves += 1
+
+
+def prune():
+    config = load_config()
+    days = config.get("fingerprint_max_age_days", 30)
+    conn = _db()
+    conn.execute("DELETE FROM pages WHERE updated_at < ?", (time.time() - days * 86400,))
+    conn.execute(
+        "DELETE FROM pages WHERE rowid IN (SELECT rowid FROM pages ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+        (config.get("fingerprint_max_entries", 50000),)
+    )
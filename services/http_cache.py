@@ -0,0 +1,158 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from email.utils import parsedate_to_datetime
+from core.urls import normalize_url
+from services.data_manager import DATA_DIR, load_config
+
+HTTP_CACHE_FILE = os.path.join(DATA_DIR, "http_cache.db")
+CACHE_MODES = ["use", "refresh", "bypass"]
+
+_local = threading.local()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    engine TEXT NOT NULL,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    cache_control TEXT,
+    stored_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_lru ON responses (last_access);
+"""
+
+
+def _conn() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(HTTP_CACHE_FILE, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        _local.conn = conn
+    return conn
+
+
+def cache_key(url: str, engine: str) -> str:
+    return hashlib.sha1(f"{engine} {normalize_url(url)}".encode("utf-8")).hexdigest()
+
+
+def check_mode(mode: str):
+    if mode not in CACHE_MODES:
+        raise ValueError(f"Unknown cache mode: {mode}")
+
+
+def freshness(headers, default_ttl: int) -> float | None:
+    # Seconds the response may be served without revalidation; None means "do not store".
+    # Without Cache-Control or Expires that is http_cache_ttl, 0 by default:
+    # the entry is kept for its validators but revalidated on every use.
+    cache_control = (headers.get("Cache-Control") or "").lower()
+    if "no-store" in cache_control:
+        return None
+    if "no-cache" in cache_control:
+        return 0
+
+    match = re.search(r"max-age=(\d+)", cache_control)
+    if match:
+        return int(match.group(1))
+
+    if headers.get("Expires"):
+        try:
+            return max(0, parsedate_to_datetime(headers["Expires"]).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return 0
+
+    return default_ttl
+
+
+def lookup(url: str, engine: str) -> dict | None:
+    row = _conn().execute(
+        "SELECT key, body, etag, last_modified, expires_at FROM responses WHERE key = ?",
+        (cache_key(url, engine),)
+    ).fetchone()
+    if row is None:
+        return None
+
+    key, body, etag, last_modified, expires_at = row
+    with _conn() as conn:
+        conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+
+    return {
+        "key": key,
+        "text": zlib.decompress(body).decode("utf-8"),
+        "etag": etag,
+        "last_modified": last_modified,
+        "fresh": time.time() < expires_at
+    }
+
+
+def store(url: str, engine: str, text: str, headers=None, ttl: float | None = None):
+    headers = headers or {}
+    config = load_config()
+    if ttl is None:
+        ttl = freshness(headers, config.get("http_cache_ttl", 0))
+        if ttl is None:
+            return
+
+    body = zlib.compress(text.encode("utf-8"), 6)
+    now = time.time()
+
+    with _conn() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                cache_key(url, engine), normalize_url(url), engine, body, len(body),
+                headers.get("ETag"), headers.get("Last-Modified"), headers.get("Cache-Control"),
+                now, now + ttl, now
+            )
+        )
+
+    evict(config.get("http_cache_max_bytes", 256 * 1024 * 1024))
+
+
+def revalidated(entry: dict, headers):
+    ttl = freshness(headers, load_config().get("http_cache_ttl", 0)) or 0
+    with _conn() as conn:
+        conn.execute(
+            "UPDATE responses SET expires_at = ?, etag = COALESCE(?, etag), "
+            "last_modified = COALESCE(?, last_modified) WHERE key = ?",
+            (time.time() + ttl, headers.get("ETag"), headers.get("Last-Modified"), entry["key"])
+        )
+
+
+def conditional_headers(entry: dict | None) -> dict:
+    headers = {}
+    if entry and entry["etag"]:
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry["last_modified"]:
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+def evict(max_bytes: int):
+    conn = _conn()
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+    if total <= max_bytes:
+        return
+
+    # Trim to 90% so a full cache doesn't evict on every single store.
+    target = total - int(max_bytes * 0.9)
+    freed = 0
+    victims = []
+    for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_access"):
+        victims.append((key,))
+        freed += size
+        if freed >= target:
+            break
+
+    with conn:
+        conn.executemany("DELETE FROM responses WHERE key = ?", victims)
@@ -0,0 +1,162 @@
+import hashlib
+import io
+import json
+import mimetypes
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from engines import client
+from services.data_manager import load_config
+
+# mimetypes picks odd first choices for a few of these (.jpe, .svgz, ...)
+IMAGE_EXTENSIONS = {
+    "image/jpeg": "jpg",
+    "image/jpg": "jpg",
+    "image/pjpeg": "jpg",
+    "image/png": "png",
+    "image/gif": "gif",
+    "image/webp": "webp",
+    "image/avif": "avif",
+    "image/svg+xml": "svg",
+    "image/bmp": "bmp",
+    "image/x-icon": "ico",
+    "image/vnd.microsoft.icon": "ico",
+    "image/tiff": "tiff"
+}
+
+
+class ImageTooLarge(Exception):
+    pass
+
+
+class ZipSink(io.RawIOBase):
+    # Write-only, unseekable target for ZipFile: whatever has been written
+    # since the last drain() is handed to the client, so the archive is never
+    # held in memory. ZipFile switches to data descriptors on its own.
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def image_extension(content_type: str | None) -> str | None:
+    mime = (content_type or "").split(";")[0].strip().lower()
+    if mime in IMAGE_EXTENSIONS:
+        return IMAGE_EXTENSIONS[mime]
+    if mime.startswith("image/"):
+        ext = mimetypes.guess_extension(mime)
+        return ext.lstrip(".") if ext else "img"
+    return None
+
+
+def fetch_image(src: str, max_bytes: int) -> tuple:
+    response = client.get(src, timeout=5, stream=True, headers={"User-Agent": "Mozilla/5.0"})
+    try:
+        response.raise_for_status()
+        ext = image_extension(response.headers.get("Content-Type"))
+        if ext is None:
+            raise ValueError(f"not an image ({response.headers.get('Content-Type')})")
+
+        if int(response.headers.get("Content-Length") or 0) > max_bytes:
+            raise ImageTooLarge(f"larger than {max_bytes} bytes")
+
+        body = bytearray()
+        for chunk in response.iter_content(65536):
+            body.extend(chunk)
+            if len(body) > max_bytes:
+                raise ImageTooLarge(f"larger than {max_bytes} bytes")
+        return ext, bytes(body)
+    finally:
+        response.close()
+
+
+def iter_image_zip(images: list):
+    # Yields the zip archive in pieces as images arrive. Downloads run a few at
+    # a time over the pooled session; duplicate URLs are fetched once and
+    # duplicate bytes stored once. A manifest.json at the end lists what was
+    # skipped and why.
+    config = load_config()
+    workers = config.get("image_download_workers", 6)
+    max_bytes = config.get("image_max_bytes", 10 * 1024 * 1024)
+    max_total = config.get("image_archive_max_bytes", 200 * 1024 * 1024)
+
+    sources = []
+    seen = set()
+    for img in images:
+        src = (img.get("src") or "").strip()
+        if src.startswith(("http://", "https://")) and src not in seen:
+            seen.add(src)
+            sources.append(src)
+
+    sink = ZipSink()
+    zf = zipfile.ZipFile(sink, "w", zipfile.ZIP_STORED)
+    pool = ThreadPoolExecutor(workers, thread_name_prefix="images")
+    manifest = {"files": {}, "duplicates": {}, "skipped": {}}
+    hashes = {}
+    total = 0
+    full = False
+    pending = {}
+    queued = iter(enumerate(sources, 1))
+
+    def fill():
+        # Keep the window small so at most ~2x workers images sit in memory.
+        while len(pending) < workers * 2:
+            item = next(queued, None)
+            if item is None:
+                return
+            pending[pool.submit(fetch_image, item[1], max_bytes)] = item
+
+    try:
+        fill()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                number, src = pending.pop(future)
+                try:
+                    ext, body = future.result()
+                except Exception as e:
+                    manifest["skipped"][src] = str(e) or type(e).__name__
+                    continue
+
+                digest = hashlib.sha256(body).hexdigest()
+                if digest in hashes:
+                    manifest["duplicates"][src] = hashes[digest]
+                    continue
+                if total + len(body) > max_total:
+                    manifest["skipped"][src] = f"archive limit of {max_total} bytes reached"
+                    full = True
+                    continue
+
+                name = f"image_{number}.{ext}"
+                hashes[digest] = name
+                total += len(body)
+                zf.writestr(name, body)
+                manifest["files"][name] = src
+                yield sink.drain()
+            if full:
+                # Nothing more can go in: drop queued downloads instead of
+                # fetching images only to throw them away.
+                for future, (number, src) in pending.items():
+                    future.cancel()
+                    manifest["skipped"][src] = f"archive limit of {max_total} bytes reached"
+                for number, src in queued:
+                    manifest["skipped"][src] = f"archive limit of {max_total} bytes reached"
+                pending.clear()
+                break
+            fill()
+
+        zf.writestr("manifest.json", json.dumps(manifest, indent=2))
+        zf.close()
+        yield sink.drain()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,205 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from services.data_manager import DATA_DIR, load_config
+
+JOBS_DB = os.path.join(DATA_DIR, "jobs.db")
+FINISHED = ["done", "failed", "cancelled"]
+
+_local = threading.local()
+_WORKERS = []
+_WORKERS_LOCK = threading.Lock()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    params TEXT NOT NULL,
+    pages_done INTEGER NOT NULL DEFAULT 0,
+    current_url TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    result BLOB,
+    error TEXT,
+    worker TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    heartbeat_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, created_at);
+"""
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def _db() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(JOBS_DB, timeout=10, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        _local.conn = conn
+    return conn
+
+
+def submit(params: dict) -> str:
+    job_id = uuid.uuid4().hex
+    _db().execute(
+        "INSERT INTO jobs (id, status, params, created_at) VALUES (?, 'queued', ?, ?)",
+        (job_id, json.dumps(params), time.time())
+    )
+    return job_id
+
+
+def get_job(job_id: str) -> dict | None:
+    row = _db().execute(
+        "SELECT id, status, params, pages_done, current_url, error, "
+        "created_at, started_at, finished_at FROM jobs WHERE id = ?",
+        (job_id,)
+    ).fetchone()
+    if row is None:
+        return None
+
+    params = json.loads(row["params"])
+    return {
+        "job_id": row["id"],
+        "status": row["status"],
+        "url": params.get("url"),
+        "progress": {
+            "pages_done": row["pages_done"],
+            "max_pages": params.get("max_pages"),
+            "current_url": row["current_url"]
+        },
+        "error": row["error"],
+        "created_at": row["created_at"],
+        "started_at": row["started_at"],
+        "finished_at": row["finished_at"]
+    }
+
+
+def get_result(job_id: str) -> dict | None:
+    row = _db().execute("SELECT result FROM jobs WHERE id = ? AND status = 'done'", (job_id,)).fetchone()
+    if row is None or row["result"] is None:
+        return None
+    return json.loads(zlib.decompress(row["result"]))
+
+
+def cancel(job_id: str) -> bool:
+    conn = _db()
+    # Queued jobs never start; running ones stop at their next page boundary.
+    cur = conn.execute(
+        "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status = 'queued'",
+        (time.time(), job_id)
+    )
+    if cur.rowcount:
+        return True
+    cur = conn.execute(
+        "UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running'",
+        (job_id,)
+    )
+    return cur.rowcount > 0
+
+
+def report_progress(job_id: str, pages_done: int, current_url: str | None):
+    conn = _db()
+    conn.execute(
+        "UPDATE jobs SET pages_done = ?, current_url = ?, heartbeat_at = ? WHERE id = ?",
+        (pages_done, current_url, time.time(), job_id)
+    )
+    row = conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    if row and row["cancel_requested"]:
+        raise JobCancelled(f"Job {job_id} was cancelled")
+
+
+def _claim(worker: str) -> sqlite3.Row | None:
+    conn = _db()
+    stale_after = load_config().get("job_stale_after", 600)
+    now = time.time()
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # A job whose worker process died stops heartbeating; put it back.
+        conn.execute(
+            "UPDATE jobs SET status = 'queued', worker = NULL "
+            "WHERE status = 'running' AND heartbeat_at < ?",
+            (now - stale_after,)
+        )
+        row = conn.execute(
+            "SELECT id, params FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+        ).fetchone()
+        if row is not None:
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, started_at = ?, heartbeat_at = ? WHERE id = ?",
+                (worker, now, now, row["id"])
+            )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return row
+
+
+def _finish(job_id: str, status: str, result: dict | None = None, error: str | None = None):
+    body = zlib.compress(json.dumps(result).encode("utf-8")) if result is not None else None
+    _db().execute(
+        "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, current_url = NULL WHERE id = ?",
+        (status, body, error, time.time(), job_id)
+    )
+
+
+def prune_jobs():
+    hours = load_config().get("job_retention_hours", 24)
+    _db().execute(
+        f"DELETE FROM jobs WHERE status IN ({','.join('?' * len(FINISHED))}) AND finished_at < ?",
+        (*FINISHED, time.time() - hours * 3600)
+    )
+
+
+def _work(run, worker: str):
+    poll = load_config().get("job_poll_interval", 0.5)
+    while True:
+        try:
+            row = _claim(worker)
+        except sqlite3.OperationalError:
+            row = None  # database busy; try again next tick
+        if row is None:
+            time.sleep(poll)
+            continue
+
+        job_id = row["id"]
+        params = json.loads(row["params"])
+        try:
+            result = run(**params, progress=lambda pages, url: report_progress(job_id, pages, url))
+            _finish(job_id, "done", result)
+        except JobCancelled:
+            _finish(job_id, "cancelled")
+        except Exception as e:
+            _finish(job_id, "failed", error=str(e))
+
+        try:
+            prune_jobs()
+        except sqlite3.OperationalError:
+            pass
+
+
+def start_workers(run):
+    # `run` is the scrape callable; it receives the submitted params plus a
+    # progress(pages_done, current_url) callback that raises JobCancelled.
+    with _WORKERS_LOCK:
+        if _WORKERS:
+            return
+        count = load_config().get("job_workers", 2)
+        for i in range(count):
+            worker = threading.Thread(
+                target=_work, args=(run, f"{os.getpid()}-{i}"),
+                daemon=True, name=f"job-worker-{i}"
+            )
+            worker.start()
+            _WORKERS.append(worker)
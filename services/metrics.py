@@ -0,0 +1,180 @@
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from core import timing
+from core.urls import url_host
+from services.data_manager import DATA_DIR, load_config
+
+# Each worker process buffers samples in memory and adds them into one shared
+# SQLite file every few seconds, so /metrics on any worker reports the totals
+# of all of them.
+METRICS_DB = os.path.join(DATA_DIR, "metrics.db")
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+METRICS = {
+    # Histograms carry no domain label: one series per domain per bucket grows without bound.
+    "scraper_stage_seconds": ("histogram", "Time spent per scrape stage (outermost stage only, so stages never overlap)."),
+    "scraper_extractor_seconds": ("histogram", "Time spent inside each structure extractor during the document walk."),
+    "scraper_fetch_bytes_total": ("counter", "Bytes fetched over the network (estimated from Content-Length for dynamic renders)."),
+    "scraper_engine_total": ("counter", "Pages fetched, by engine and how the engine was chosen."),
+    "scraper_cache_total": ("counter", "HTTP/render cache outcomes per fetched page."),
+    "scraper_pages_total": ("counter", "Pages scraped.")
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    name TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    le TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (name, labels, le)
+);
+"""
+
+_pending = {}
+_lock = threading.Lock()
+_local = threading.local()
+# Settings are re-read at each flush rather than on every sample.
+_settings = {"next_flush": 0.0, "extractor_timing": False}
+
+
+def _db() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(METRICS_DB, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        _local.conn = conn
+    return conn
+
+
+def _add(name: str, labels: dict, le: str, value: float):
+    key = (name, json.dumps(labels, sort_keys=True), le)
+    _pending[key] = _pending.get(key, 0) + value
+
+
+def _maybe_flush():
+    if time.time() >= _settings["next_flush"]:
+        flush()
+
+
+def inc(name: str, value: float = 1, **labels):
+    with _lock:
+        _add(name, labels, "", value)
+    _maybe_flush()
+
+
+def observe(name: str, seconds: float, **labels):
+    with _lock:
+        for bound in BUCKETS:
+            if seconds <= bound:
+                _add(name, labels, str(bound), 1)
+                break
+        else:
+            _add(name, labels, "+Inf", 1)
+        _add(name, labels, "sum", seconds)
+        _add(name, labels, "count", 1)
+    _maybe_flush()
+
+
+def flush():
+    with _lock:
+        samples = list(_pending.items())
+        _pending.clear()
+        config = load_config()
+        _settings["next_flush"] = time.time() + config.get("metrics_flush_interval", 5)
+        _settings["extractor_timing"] = config.get("metrics_extractor_timing", False)
+    if not samples:
+        return
+
+    try:
+        with _db() as conn:
+            conn.executemany(
+                "INSERT INTO samples VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (name, labels, le) DO UPDATE SET value = value + excluded.value",
+                [(*key, value) for key, value in samples]
+            )
+    except sqlite3.OperationalError:
+        # database busy; keep the samples for the next flush
+        with _lock:
+            for key, value in samples:
+                _pending[key] = _pending.get(key, 0) + value
+
+
+atexit.register(flush)
+
+
+def _observe_stage(name: str, seconds: float, mode: str):
+    observe("scraper_stage_seconds", seconds, stage=name, mode=mode)
+
+
+def _observe_extractors(spent: dict, mode: str):
+    for name, seconds in spent.items():
+        observe("scraper_extractor_seconds", seconds, extractor=name, mode=mode)
+
+
+def _extractor_timing() -> bool:
+    _maybe_flush()
+    return _settings["extractor_timing"]
+
+
+# Core code times its stages through core.timing; this is where they land.
+timing.set_recorder(_observe_stage, _observe_extractors, _extractor_timing)
+page_context = timing.page_context
+
+
+def record_fetch(url: str, info: dict):
+    domain = url_host(url)
+    engine = info.get("engine", "static")
+    inc("scraper_engine_total", engine=engine, source=info.get("engine_source", ""), domain=domain)
+    inc("scraper_cache_total", engine=engine, result=info.get("cache", "none"), domain=domain)
+    if info.get("bytes"):
+        inc("scraper_fetch_bytes_total", info["bytes"], engine=engine, domain=domain)
+    inc("scraper_pages_total", domain=domain, mode=timing.current_mode())
+
+
+def _label_text(labels: dict) -> str:
+    parts = []
+    for k, v in labels.items():
+        v = str(v).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        parts.append(f'{k}="{v}"')
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value) -> str:
+    # Counts are stored as REAL; print them in full, never rounded to 6 digits.
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def render() -> str:
+    # Prometheus text exposition format.
+    flush()
+    rows = _db().execute("SELECT name, labels, le, value FROM samples ORDER BY name, labels").fetchall()
+
+    series = {}
+    for name, labels, le, value in rows:
+        series.setdefault(name, {}).setdefault(labels, {})[le] = value
+
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, values in series.get(name, {}).items():
+            labels = json.loads(labels)
+            if kind == "counter":
+                lines.append(f"{name}{_label_text(labels)} {_number(values.get('', 0))}")
+                continue
+
+            cumulative = 0
+            for bound in [*map(str, BUCKETS), "+Inf"]:
+                cumulative += values.get(bound, 0)
+                lines.append(f"{name}_bucket{_label_text({**labels, 'le': bound})} {_number(cumulative)}")
+            lines.append(f"{name}_sum{_label_text(labels)} {values.get('sum', 0):.6f}")
+            lines.append(f"{name}_count{_label_text(labels)} {_number(values.get('count', 0))}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,102 @@
+import json
+import os
+import sqlite3
+import threading
+from core.schemas import BOOKS_SCHEMA, SchemaIndex, compile_schema
+from services.data_manager import DATA_DIR
+
+# User schemas live in schemas.db next to the other state files and are
+# shared by every worker process. Each change bumps the database's
+# user_version; a process rebuilds its compiled index when that moves.
+# Built-in schemas are always present and a user schema with the same name
+# replaces one.
+SCHEMAS_DB = os.path.join(DATA_DIR, "schemas.db")
+BUILTIN_SCHEMAS = [BOOKS_SCHEMA]
+
+# Used for "product" mode on pages no schema claims.
+DEFAULT_SCHEMA = compile_schema(BOOKS_SCHEMA)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS schemas (
+    name TEXT PRIMARY KEY,
+    spec TEXT NOT NULL
+);
+"""
+
+_local = threading.local()
+_LOCK = threading.Lock()
+_USER = {}
+_VERSION = None
+_INDEX = None
+
+
+def _db() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(SCHEMAS_DB, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        _local.conn = conn
+    return conn
+
+
+def _load():
+    global _USER, _VERSION, _INDEX
+    conn = _db()
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if _INDEX is not None and version == _VERSION:
+        return
+
+    # Rows are read after the version, so a write in between only means one
+    # extra rebuild on the next lookup, never a stale index.
+    user = {name: json.loads(spec) for name, spec in conn.execute("SELECT name, spec FROM schemas ORDER BY name")}
+    specs = {spec["name"]: spec for spec in BUILTIN_SCHEMAS}
+    specs.update(user)
+    compiled = []
+    for spec in specs.values():
+        try:
+            compiled.append(compile_schema(spec))
+        except ValueError:
+            pass  # validated on register; skip one edited into a bad state by hand
+    _USER, _VERSION, _INDEX = user, version, SchemaIndex(compiled)
+
+
+def _write(sql: str, params: tuple) -> int:
+    # The change and the version bump commit together, so concurrent writers
+    # in different processes never overwrite each other's schemas.
+    conn = _db()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        changed = conn.execute(sql, params).rowcount
+        if changed:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            conn.execute(f"PRAGMA user_version = {version + 1}")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return changed
+
+
+def match(url: str):
+    with _LOCK:
+        _load()
+        return _INDEX.match(url)
+
+
+def list_schemas() -> list:
+    with _LOCK:
+        _load()
+        specs = {spec["name"]: {**spec, "builtin": True} for spec in BUILTIN_SCHEMAS}
+        specs.update(_USER)
+        return list(specs.values())
+
+
+def register(spec: dict):
+    # Raises ValueError if the schema doesn't compile; nothing is saved then.
+    compile_schema(spec)
+    _write("INSERT OR REPLACE INTO schemas VALUES (?, ?)", (spec["name"], json.dumps(spec)))
+
+
+def remove(name: str) -> bool:
+    return _write("DELETE FROM schemas WHERE name = ?", (name,)) > 0
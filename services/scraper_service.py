@@ -1,35 +1,509 @@
-from core.detector import needs_js
-from core.cleaner import clean_html
-from core.extractor import extract_main_content
-from core.structures import extract_tables, extract_links, extract_images
-from core.paginator import find_next_page
-from core.ethics import check_robots, rate_limit, is_sensitive
-from core.products import extract_books
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from core.detector import needs_js, has_static_content
+from core.document import ParsedPage
+from core.structures import TablesExtractor, LinksExtractor, ImagesExtractor
+from core.paginator import NextPageExtractor, scan_pagination, infer_template, template_url, template_number, visible_last
+from core.ethics import check_robots, rate_limit, domain_slot, is_sensitive
+from core.schemas import SchemaExtractor
+from core.frontier import Frontier
+from core.changes import fingerprint, changed_only as diff_page
+from core.urls import canonicalize_url, url_host
 from engines.static import fetch_static
 from engines.dynamic import fetch_dynamic
+from services import http_cache
+from services.engine_cache import ENGINES, get_engine, record_engine
+from services import extract_pool, fingerprints, metrics, schema_registry
+from services.data_manager import DATA_DIR, load_config
 
+FRONTIER_DIR = os.path.join(DATA_DIR, "frontiers")
+
+
+def fetch_page(
+    url: str,
+    info: dict | None = None,
+    render_profile: str | None = None,
+    engine: str = "auto",
+    cache: str = "use"
+) -> str:
+    info = {} if info is None else info
+    http_cache.check_mode(cache)
+
+    if engine != "auto" and engine not in ENGINES:
+        raise ValueError(f"Unknown engine: {engine}")
+
+    if engine == "auto":
+        engine = get_engine(url)
+        info["engine_source"] = "cache" if engine else "detector"
+    else:
+        info["engine_source"] = "override"
+
+    if engine == "dynamic":
+        info["engine"] = "dynamic"
+        return fetch_dynamic(url, info, render_profile, cache)
+
+    info["engine"] = "static"
+    html = fetch_static(url, info, cache)
+    if engine == "static" and info["engine_source"] == "override":
+        return html
+
+    # Only pay for a browser render when the static HTML is a JS shell. The
+    # visible-text check parses the page, so it only runs behind a JS signal.
+    js_signals = needs_js(html)
+    static_content = has_static_content(html) if js_signals else None
+
+    if js_signals and not static_content:
+        info["engine"] = "dynamic"
+        html = fetch_dynamic(url, info, render_profile, cache)
+
+    if info["engine_source"] == "detector" or info["engine"] != engine:
+        record_engine(url, info["engine"], js_signals, static_content)
 
-def fetch_page(url: str) -> str:
-    html = fetch_static(url)
-    if needs_js(html):
-        html = fetch_dynamic(url)
     return html
 
 
-def scrape_service(
+def page_needs(mode: str, url: str) -> set:
+    # What a mode pulls out of one page. "content" means readability; the rest
+    # are structure extractors, and links/images alone can skip the DOM.
+    listing = schema_registry.match(url) is not None
+    needs = set()
+
+    if mode == "product" or (mode == "auto" and listing):
+        needs.add("products")
+    if mode == "article" or (mode == "auto" and not listing):
+        needs.add("content")
+    if mode in ["auto", "tables"]:
+        needs.add("tables")
+    if mode in ["auto", "links"]:
+        needs.add("links")
+    if mode in ["auto", "images"]:
+        needs.add("images")
+
+    return needs
+
+
+def page_extractors(needs: set, url: str) -> dict:
+    # Everything a page needs comes out of a single walk of the cleaned tree.
+    extractors = {"next_page": NextPageExtractor(url)}
+
+    if "products" in needs:
+        schema = schema_registry.match(url) or schema_registry.DEFAULT_SCHEMA
+        extractors["products"] = SchemaExtractor(schema, url)
+    if "tables" in needs:
+        extractors["tables"] = TablesExtractor()
+    if "links" in needs:
+        extractors["links"] = LinksExtractor(url)
+    if "images" in needs:
+        extractors["images"] = ImagesExtractor(url)
+
+    return extractors
+
+
+def extract_page(html: str, url: str, needs: set, mode: str, find_next: bool = True) -> tuple:
+    # Plain arguments in, plain dicts out, so it can run on an extraction
+    # worker process as well as in this one.
+    doc = ParsedPage(html, url, needs)
+    extractors = page_extractors(needs, url)
+    if not find_next:
+        del extractors["next_page"]
+
+    with metrics.page_context(mode) as stages:
+        record = doc.extract(extractors)
+        if "content" in needs:
+            record["content"] = doc.main_content
+    return record, doc.stats(), stages
+
+
+def merge_page(result: dict, record: dict, seen_links: set | None = None):
+    # `seen_links` carries canonical URLs across pages, so a link that shows up
+    # on every page (nav, footer) is listed once for the whole run.
+    result["products"].extend(record.get("products", []))
+    result["tables"].extend(record.get("tables", []))
+    result["images"].extend(record.get("images", []))
+
+    if "content" in record:
+        result["content"].append(record["content"])
+
+    if "links" in record:
+        for kind in ["internal", "external"]:
+            for link in record["links"][kind]:
+                if seen_links is not None:
+                    key = canonicalize_url(link)
+                    if key in seen_links:
+                        continue
+                    seen_links.add(key)
+                result["links"][kind].append(link)
+
+    # changed_only runs: one entry per page saying what moved since last time.
+    if "change" in record:
+        result.setdefault("changes", []).append(
+            {"url": record["url"], "change": record["change"], "diff": record.get("diff")}
+        )
+
+
+def connection_summary(pages: list) -> dict:
+    fetched = [p for p in pages if "connection_reused" in p]
+    reused = sum(1 for p in fetched if p["connection_reused"])
+    return {"requests": len(fetched), "reused": reused}
+
+
+def cache_summary(pages: list) -> dict:
+    counts = {"hit": 0, "miss": 0, "revalidated": 0}
+    for p in pages:
+        if p.get("cache") in counts:
+            counts[p["cache"]] += 1
+    return counts
+
+
+def new_stats() -> dict:
+    return {"pages": 0, "articles": 0, "products": 0, "tables": 0, "images": 0}
+
+
+def count_page(stats: dict, record: dict):
+    stats["pages"] += 1
+    stats["articles"] += 1 if "content" in record else 0
+    stats["products"] += len(record.get("products", []))
+    stats["tables"] += len(record.get("tables", []))
+    stats["images"] += len(record.get("images", []))
+
+
+def timing_summary(pages: list) -> dict:
+    # Stage spans are [start, end] in ms since the crawl began. With
+    # pipelining, fetches overlap extraction, so wall time drops below the
+    # serial sum; "overlap_ms" is how much was hidden.
+    spans = [p["timings"] for p in pages if "timings" in p]
+    if not spans:
+        return {}
+
+    totals = {"wait_ms": 0.0, "fetch_ms": 0.0, "scan_ms": 0.0, "extract_ms": 0.0}
+    for timings in spans:
+        for stage, (start, end) in timings.items():
+            totals[f"{stage}_ms"] += end - start
+
+    wall = max(end for t in spans for _, end in t.values()) - min(start for t in spans for start, _ in t.values())
+    serial = sum(totals.values())
+    totals = {k: round(v, 2) for k, v in totals.items()}
+    return {**totals, "wall_ms": round(wall, 2), "overlap_ms": round(max(0.0, serial - wall), 2)}
+
+
+def run_meta(pages: list) -> dict:
+    return {
+        "pages": pages,
+        "connections": connection_summary(pages),
+        "cache": cache_summary(pages),
+        "timings": timing_summary(pages)
+    }
+
+
+def fetch_stage(url: str, delay, clock, slots, render_profile, engine, cache, mode, reserved: bool = False) -> tuple:
+    # `reserved`: the caller already booked this request's slot (the batch
+    # scheduler does, without sleeping), so there is nothing to wait for.
+    info = {"url": url}
+    with metrics.page_context(mode) as stages:
+        started = clock()
+        if not reserved:
+            rate_limit(url, delay)
+        with domain_slot(url, slots):
+            fetch_start = clock()
+            html = fetch_page(url, info, render_profile, engine, cache)
+        metrics.record_fetch(url, info)
+    info["timings"] = {"wait": [started, fetch_start], "fetch": [fetch_start, clock()]}
+    info["stages"] = stages
+    return html, info
+
+
+def extract_stage(
+    html: str, url: str, needs: set, mode: str, cache: str, info: dict,
+    find_next: bool = True, monitor_id: str | None = None
+) -> tuple:
+    # When the page fingerprint matches the last run, the stored record is
+    # returned without parsing (unless the cache is bypassed). Also returns
+    # the previous record for changed_only diffs.
+    digest = fingerprint(html)
+    previous = fingerprints.load(url, store_key(url, needs, monitor_id))
+    if previous is None:
+        info["change"] = "new"
+    else:
+        info["change"] = "unchanged" if previous["digest"] == digest else "changed"
+    info["fingerprint"] = digest
+
+    if info["change"] == "unchanged" and cache != "bypass":
+        info["reused"] = True
+        return previous["record"], {"parser": None, "parses": 0, "parse_ms": 0.0}, {}, previous["record"]
+
+    record, stats, stages = extract_pool.call(extract_page, html, url, needs, mode, find_next)
+    return record, stats, stages, previous and previous["record"]
+
+
+def store_key(url: str, needs: set, monitor_id: str | None = None) -> set:
+    # A stored record is only valid for the schema version that produced it.
+    # With a monitor_id the record is that monitor's own baseline; without
+    # one it is whatever any caller last scraped.
+    key = set(needs)
+    if "products" in needs:
+        schema = schema_registry.match(url) or schema_registry.DEFAULT_SCHEMA
+        key.add(f"schema:{schema.name}:{schema.digest}")
+    if monitor_id:
+        key.add(f"monitor:{monitor_id}")
+    return key
+
+
+def remember_page(url: str, needs: set, info: dict, record: dict, next_url: str | None, monitor_id: str | None = None):
+    if info["change"] != "unchanged":
+        fingerprints.save(url, store_key(url, needs, monitor_id), info["fingerprint"], {**record, "next_page": next_url})
+
+
+def check_monitor_id(monitor_id: str | None):
+    if monitor_id is not None and not re.fullmatch(r"[\w-]{1,100}", monitor_id):
+        raise ValueError(f"Invalid monitor_id: {monitor_id}")
+
+
+def iter_scrape(
     url: str,
     mode: str = "auto",
-    max_pages: int = 1
-) -> dict:
-
+    max_pages: int = 1,
+    render_profile: str | None = None,
+    engine: str = "auto",
+    cache: str = "use",
+    progress=None,
+    pipeline: bool | None = None,
+    robots: dict | None = None,
+    crawl: bool = False,
+    max_depth: int = 2,
+    crawl_id: str | None = None,
+    changed_only: bool = False,
+    monitor_id: str | None = None,
+    reserved: bool = False
+):
+    # Yields one record per page as soon as it is extracted. Nothing is kept
+    # between pages, so memory stays flat however long the crawl runs.
     if is_sensitive(url):
         raise Exception("Sensitive URLs are blocked")
+    check_monitor_id(monitor_id)
+
+    if crawl:
+        yield from iter_crawl(
+            url, mode, max_pages, render_profile, engine, cache, progress, robots, max_depth, crawl_id,
+            changed_only, monitor_id, reserved
+        )
+        return
+
+    config = load_config()
+    max_pages = min(max_pages, config.get("max_pages_limit", 10))
+    if pipeline is None:
+        pipeline = config.get("pipeline_pagination", True)
+    delay = check_robots(url, robots=robots)
 
-    delay = check_robots(url)
+    t0 = time.perf_counter()
+    clock = lambda: round((time.perf_counter() - t0) * 1000, 2)
+    slots = config.get("domain_concurrency", 2)
+    fetch_args = (delay, clock, slots, render_profile, engine, cache, mode)
+
+    # Pipelined: later pages are fetched on background threads (still behind
+    # rate_limit and the per-domain slots) while this one is being extracted.
+    # If the first page reveals a URL template, every page it predicts is
+    # queued at once; otherwise only the next link is.
+    prefetch = ThreadPoolExecutor(slots, thread_name_prefix="prefetch") if pipeline and max_pages > 1 else None
+    pending = {}
+    template = None
+    enumerated = 0
+
+    def submit(target_url: str, source: str):
+        if target_url not in pending:
+            pending[target_url] = (prefetch.submit(fetch_stage, target_url, *fetch_args), source)
 
     page = 0
     current_url = url
 
+    try:
+        while current_url and page < max_pages:
+            if progress:
+                progress(page, current_url)
+            page += 1
+
+            entry = pending.pop(current_url, None)
+            if entry is None and pending:
+                # The real next link left the predicted sequence: drop the
+                # predictions and go back to plain link-following.
+                for future, _ in pending.values():
+                    future.cancel()
+                pending.clear()
+                template = None
+
+            if entry is not None:
+                html, info = entry[0].result()
+                info["prefetch"] = entry[1]
+            else:
+                html, info = fetch_stage(current_url, *fetch_args, reserved=reserved and page == 1)
+
+            needs = page_needs(mode, current_url)
+            scanned = bool(prefetch and page < max_pages)
+            next_url = None
+
+            with metrics.page_context(mode) as stages:
+                if scanned:
+                    start = clock()
+                    scan = scan_pagination(html, current_url)
+                    info["timings"]["scan"] = [start, clock()]
+                    next_url = scan["next_page"]
+
+                    if page == 1:
+                        template = infer_template(current_url, scan)
+                        if template:
+                            info["template"] = template_url(template, "{page}")
+
+                    number = template_number(template, next_url) if template else None
+                    if number is not None:
+                        # Listing page `number` is crawl page `page + 1`.
+                        last = template["last"] or visible_last(template, scan, number - 1)
+                        last = min(last, number + max_pages - page - 1)
+                        for n in range(max(number, enumerated + 1), last + 1):
+                            submit(template_url(template, n), "template")
+                        enumerated = max(enumerated, last)
+                    if next_url:
+                        submit(next_url, "next")
+            info["stages"].update(stages)
+
+            # ---- MODE DECISION ----
+            start = clock()
+            record, stats, stages, previous = extract_stage(
+                html, current_url, needs, mode, cache, info, not scanned, monitor_id
+            )
+            next_url = record.pop("next_page", next_url)
+            remember_page(current_url, needs, info, record, next_url, monitor_id)
+            if changed_only:
+                record = diff_page(previous, record, info["change"])
+            info["timings"]["extract"] = [start, clock()]
+            info["stages"].update(stages)
+
+            info.update(stats)
+            yield {"type": "page", "page": page, "url": current_url, **record, "meta": info}
+
+            current_url = next_url
+    finally:
+        if prefetch:
+            prefetch.shutdown(wait=False, cancel_futures=True)
+
+    if progress:
+        progress(page, None)
+
+
+def frontier_path(crawl_id: str) -> str:
+    if not re.fullmatch(r"[\w-]+", crawl_id):
+        raise ValueError(f"Invalid crawl_id: {crawl_id}")
+    os.makedirs(FRONTIER_DIR, exist_ok=True)
+    return os.path.join(FRONTIER_DIR, f"{crawl_id}.json")
+
+
+def iter_crawl(
+    url: str,
+    mode: str = "auto",
+    max_pages: int = 1,
+    render_profile: str | None = None,
+    engine: str = "auto",
+    cache: str = "use",
+    progress=None,
+    robots: dict | None = None,
+    max_depth: int = 2,
+    crawl_id: str | None = None,
+    changed_only: bool = False,
+    monitor_id: str | None = None,
+    reserved: bool = False
+):
+    # Site crawl: every internal link goes into the frontier (canonicalized
+    # and deduplicated), pages come back out breadth-first with next-page
+    # links ahead of the rest. With a crawl_id the frontier is saved as the
+    # crawl goes, and the same id picks up where it stopped.
+    config = load_config()
+    max_pages = min(max_pages, config.get("max_pages_limit", 10))
+    robots = {} if robots is None else robots
+    path = frontier_path(crawl_id) if crawl_id else None
+
+    if path and os.path.exists(path):
+        frontier = Frontier.load(path)
+    else:
+        frontier = Frontier(config.get("crawl_seen_initial", 10_000))
+        frontier.push(url, 0)
+
+    t0 = time.perf_counter()
+    clock = lambda: round((time.perf_counter() - t0) * 1000, 2)
+    slots = config.get("domain_concurrency", 2)
+    start_host = url_host(url)
+    save_every = config.get("crawl_save_every", 10)
+    page = 0
+    fetched = 0
+
+    try:
+        while fetched < max_pages:
+            item = frontier.pop()
+            if item is None:
+                break
+            current_url, depth = item
+            if is_sensitive(current_url):
+                continue
+            try:
+                delay = check_robots(current_url, robots=robots)
+            except PermissionError:
+                continue
+
+            if progress:
+                progress(page, current_url)
+            fetched += 1
+
+            try:
+                html, info = fetch_stage(
+                    current_url, delay, clock, slots, render_profile, engine, cache, mode, reserved and fetched == 1
+                )
+            except Exception:
+                continue  # one dead link shouldn't end a site crawl; it still counts toward max_pages
+            page += 1
+
+            needs = page_needs(mode, current_url)
+            start = clock()
+            record, stats, stages, previous = extract_stage(
+                html, current_url, needs | {"links"}, mode, cache, info, monitor_id=monitor_id
+            )
+            next_url = record.pop("next_page")
+            remember_page(current_url, needs | {"links"}, info, record, next_url, monitor_id)
+            info["timings"]["extract"] = [start, clock()]
+            info["stages"].update(stages)
+
+            if depth < max_depth:
+                if next_url and url_host(next_url) == start_host:
+                    frontier.push(next_url, depth + 1, priority=1)
+                for link in record["links"]["internal"]:
+                    frontier.push(link, depth + 1)
+            if "links" not in needs:
+                del record["links"]
+            if changed_only:
+                record = diff_page(previous, record, info["change"])
+            info["depth"] = depth
+            info["frontier"] = len(frontier)
+
+            info.update(stats)
+            yield {"type": "page", "page": page, "url": current_url, **record, "meta": info}
+
+            if path and fetched % save_every == 0:
+                frontier.save(path)
+    finally:
+        if path:
+            frontier.save(path)
+
+    if progress:
+        progress(page, None)
+
+
+def scrape_service(
+    url: str,
+    mode: str = "auto",
+    max_pages: int = 1,
+    render_profile: str | None = None,
+    engine: str = "auto",
+    cache: str = "use"
+) -> dict:
+
     result = {
         "meta": {
             "start_url": url,
@@ -46,34 +520,12 @@ def scrape_service(
         "images": []
     }
 
-    while current_url and page < max_pages:
-        page += 1
-        rate_limit(current_url, delay)
-
-        html = fetch_page(current_url)
-        soup = clean_html(html)
-
-        is_books = "books.toscrape.com" in current_url
-
-        # ---- MODE DECISION ----
-        if mode == "product" or (mode == "auto" and is_books):
-            result["products"].extend(extract_books(soup))
-
-        elif mode in ["article", "auto"]:
-            result["content"].append(extract_main_content(html))
-
-        if mode in ["auto", "tables"]:
-            result["tables"].extend(extract_tables(soup))
-
-        if mode in ["auto", "links"]:
-            links = extract_links(soup, current_url)
-            result["links"]["internal"].extend(links["internal"])
-            result["links"]["external"].extend(links["external"])
-
-        if mode in ["auto", "images"]:
-            result["images"].extend(extract_images(soup, current_url))
-
-        current_url = find_next_page(soup, current_url)
+    pages = []
+    seen_links = set()
+    for record in iter_scrape(url, mode, max_pages, render_profile, engine, cache):
+        merge_page(result, record, seen_links)
+        pages.append(record["meta"])
 
-    result["meta"]["pages_scraped"] = page
+    result["meta"]["pages_scraped"] = len(pages)
+    result["meta"].update(run_meta(pages))
     return result